@@ -1,5 +1,25 @@
 import apprise
 import settings
+from typing import Optional
+
+# Apprise instance with the configured services already parsed, built on
+# first use and reused for every notification
+_app: Optional[apprise.Apprise] = None
+
+
+def _get_app() -> Optional[apprise.Apprise]:
+    """
+    Returns the shared Apprise instance, creating it and adding the
+    configured services on first use. Returns None if no services are
+    configured.
+    """
+    global _app
+    if _app is None and settings.apprise_services:
+        app = apprise.Apprise()
+        for service in settings.apprise_services:
+            app.add(service)
+        _app = app
+    return _app
 
 
 def send(title: str, message: str, image_path: str) -> None:
@@ -9,12 +29,8 @@ def send(title: str, message: str, image_path: str) -> None:
     :param message: The string of the message to send
     :param image_path: Path to the image file to attach
     """
-    if settings.apprise_services:
-        # Create an Apprise instance
-        app = apprise.Apprise()
-        for service in settings.apprise_services:
-            app.add(service)
-
+    app = _get_app()
+    if app is not None:
         app.notify(body=message, title=title, attach=image_path)
 
 
@@ -0,0 +1,186 @@
+import itertools
+import logging
+import os
+import random
+import re
+import shutil
+import threading
+from typing import Any, List, Optional, Set
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    # watchdog is optional, without it only images saved by the app itself
+    # are picked up until the next restart
+    FileSystemEventHandler = object
+    Observer = None
+
+# Constants
+SAVED_IMAGES_DIR = "saved_images"
+SAVED_IMAGE_PREFIX = "img_"
+
+_NUMBERED_IMAGE_RE = re.compile(rf"{SAVED_IMAGE_PREFIX}(\d+)\.png")
+
+# Filenames in the saved images folder. Read from disk once by load() and kept
+# up to date by add(), so picking a random image doesn't list the directory on
+# the SD card every time.
+SAVED_IMAGES: List[str] = []
+# Set mirror of SAVED_IMAGES for constant-time membership checks
+_saved_image_names: Set[str] = set()
+# The index is updated from the folder watcher's thread as well
+_lock = threading.Lock()
+# Numbers for new images. Renders and sent images are saved from different
+# workers, so a timestamp to the second could give two of them the same name.
+_image_numbers = itertools.count(1)
+
+
+def load(directory: str = SAVED_IMAGES_DIR) -> List[str]:
+    """
+    Populates the index from the saved images folder. Called once at startup.
+    """
+    # scandir reports the entry type from the directory listing itself, so
+    # subfolders are skipped without a stat() per file
+    with os.scandir(directory) as entries:
+        filenames = sorted(entry.name for entry in entries if not entry.is_dir())
+    global _image_numbers
+    with _lock:
+        SAVED_IMAGES[:] = filenames
+        _saved_image_names.clear()
+        _saved_image_names.update(filenames)
+        # Carry on numbering after the highest numbered image already saved
+        numbers = (_NUMBERED_IMAGE_RE.fullmatch(filename) for filename in filenames)
+        _image_numbers = itertools.count(
+            max((int(match.group(1)) for match in numbers if match), default=0) + 1
+        )
+    logging.info(f"Found {len(SAVED_IMAGES)} saved images")
+    return SAVED_IMAGES
+
+
+def path(filename: str) -> str:
+    """
+    Returns the path of a saved image from its filename.
+    """
+    return os.path.join(SAVED_IMAGES_DIR, filename)
+
+
+def new_filename() -> str:
+    """
+    Returns a filename for a new image that no other image has, e.g.
+    "img_00000042.png".
+    """
+    return f"{SAVED_IMAGE_PREFIX}{next(_image_numbers):08d}.png"
+
+
+def add(filename: str) -> None:
+    """
+    Records an image that was just written to the saved images folder. An
+    image saved over an existing file is only listed once.
+    """
+    with _lock:
+        if filename not in _saved_image_names:
+            _saved_image_names.add(filename)
+            SAVED_IMAGES.append(filename)
+
+
+def remove(filename: str) -> None:
+    """
+    Forgets an image that was deleted from the saved images folder.
+    """
+    with _lock:
+        if filename in _saved_image_names:
+            _saved_image_names.discard(filename)
+            SAVED_IMAGES.remove(filename)
+
+
+def save_copy(source_path: str, filename: str) -> None:
+    """
+    Adds a copy of an image to the saved images folder. The copy is a hard
+    link where the filesystem allows it, so no image data is written again;
+    the source must be replaced rather than rewritten in place afterwards.
+    """
+    destination = path(filename)
+    try:
+        os.link(source_path, destination)
+    except OSError:
+        shutil.copyfile(source_path, destination)
+    add(filename)
+
+
+def pick_random(exclude: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the filename of a random saved image other than exclude, or None
+    if there isn't one.
+    """
+    with _lock:
+        if not SAVED_IMAGES or SAVED_IMAGES == [exclude]:
+            return None
+
+        # Filenames are unique, so at most one of them is excluded and a retry
+        # is rarely needed.
+        filename = random.choice(SAVED_IMAGES)
+        while filename == exclude:
+            filename = random.choice(SAVED_IMAGES)
+        return filename
+
+
+class _SavedImagesHandler(FileSystemEventHandler):
+    """
+    Mirrors files written to, removed from or renamed in the saved images
+    folder into the index. Files are indexed once they are closed rather than
+    when they are created, so a render still being written isn't displayed or
+    copied half-finished.
+    """
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self._directory = os.path.abspath(directory)
+
+    def _filename(self, event_path: str) -> Optional[str]:
+        # Only files directly in the folder are listed, like load() does
+        if os.path.dirname(os.path.abspath(event_path)) != self._directory:
+            return None
+        return os.path.basename(event_path)
+
+    def on_closed(self, event: Any) -> None:
+        filename = self._filename(event.src_path)
+        if filename and not event.is_directory:
+            add(filename)
+
+    def on_deleted(self, event: Any) -> None:
+        filename = self._filename(event.src_path)
+        if filename and not event.is_directory:
+            remove(filename)
+
+    def on_moved(self, event: Any) -> None:
+        if event.is_directory:
+            return
+        source = self._filename(event.src_path)
+        if source:
+            remove(source)
+        destination = self._filename(event.dest_path)
+        if destination:
+            add(destination)
+
+
+def watch(directory: str = SAVED_IMAGES_DIR) -> Optional[Any]:
+    """
+    Keeps the index in sync with images copied into or deleted from the
+    saved images folder by other programs, using inotify through watchdog.
+
+    Returns:
+        The running observer, to be stopped on shutdown, or None if watchdog
+        isn't installed or the folder can't be watched
+    """
+    if Observer is None:
+        return None
+    try:
+        observer = Observer()
+        observer.schedule(_SavedImagesHandler(directory), directory, recursive=False)
+        observer.daemon = True
+        observer.start()
+        logging.info(f"Watching {directory} for new and deleted images")
+        return observer
+    except Exception as e:
+        logging.warning(f"Unable to watch {directory}: {e}")
+        return None
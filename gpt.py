@@ -1,25 +1,80 @@
 import helpers
+import http_session
 import prompts
 import settings
 import logging
-import requests
-import shutil
-import threading
+import os
+import re
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image
-from pathlib import Path
-from openai import OpenAI
+from typing import Callable, Optional, Tuple
+from openai import APIConnectionError, APITimeoutError, NotFoundError, OpenAI
 from openai.types.beta.assistant import Assistant
+from openai.types.beta.thread import Thread
+
+try:
+    import pyvips
+except (ImportError, OSError):
+    # libvips is optional, Pillow is used for resizing when it's missing
+    pyvips = None
 
 # Constants
 ASSISTANT_TIMEOUT_SECONDS = 10
+ASSISTANT_CREATED_EVENT = "thread.run.created"
+ASSISTANT_COMPLETED_EVENT = "thread.run.completed"
+ASSISTANT_FAILED_EVENTS = (
+    "thread.run.failed",
+    "thread.run.cancelled",
+    "thread.run.expired",
+    "thread.run.incomplete",
+)
+ASSISTANT_ERROR_RESPONSE = (
+    "Sorry, it looks like something went wrong. Try again in a moment or two."
+)
+# Streamed replies are spoken a sentence at a time, but very short sentences
+# are held back and spoken with the next one to save a speech request
+SPEECH_MIN_SENTENCE_CHARS = 40
 IMAGE_WIDTH = 800
 IMAGE_HEIGHT = 480
 NETWORK_TIMEOUT_SECONDS = 30
+TTS_STREAM_CHUNK_BYTES = 4096
+# Opus in Ogg is about half the size of the MP3 at the same quality, so the
+# first chunk arrives sooner, and VLC decodes it just the same
+TTS_RESPONSE_FORMAT = "opus"
+# The conversation thread is kept between runs, and read by the scheduled
+# image cronjob
+ASSISTANT_THREAD_PATH = "assistant_thread.txt"
+ORIGINAL_IMAGE_PATH = "dalle_image.png"
+DISPLAY_IMAGE_PATH = "resized.png"
+# The display copy is written here and renamed over DISPLAY_IMAGE_PATH, so
+# the file is replaced rather than rewritten in place. Hard links to the
+# previous image in the saved images folder are left untouched, and nothing
+# ever reads a half-written image.
+DISPLAY_IMAGE_TEMP_PATH = "resized.tmp.png"
+# zlib level 1 encodes several times faster than the default with only a
+# slightly larger file, which is the right trade for a local display copy.
+DISPLAY_IMAGE_COMPRESS_LEVEL = 1
+
+# DALL-E images are generated on a single background worker so they overlap
+# with speech synthesis without racing each other on resized.png.
+_image_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dalle")
+
+# Sentences of a streamed reply are synthesised and played one after another
+# on this worker while the rest of the reply is still arriving.
+_speech_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speech")
+
+# Set by shutdown(), after which finished images are no longer displayed
+_shut_down = False
 
+# The end of a sentence, followed by the whitespace before the next one
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
 
-image_thread = None
+# The most recent full-size DALL-E image, as the PNG bytes it was downloaded
+# as. It is only written to disk when the user asks to send it, see
+# save_original_image().
+_last_image: Optional[bytes] = None
 
 
 def get_assistant(openai_client: OpenAI) -> Assistant:
@@ -36,17 +91,47 @@ def get_assistant(openai_client: OpenAI) -> Assistant:
         raise
 
 
+def get_assistant_thread(openai_client: OpenAI, path: str = ASSISTANT_THREAD_PATH) -> Thread:
+    """
+    Returns the conversation thread from the last run, so the assistant keeps
+    its context across restarts, or creates a new one if there isn't one or
+    it no longer exists. The thread's ID is saved to path either way.
+    """
+    thread_id = ""
+    try:
+        with open(path) as assistant_thread_file:
+            thread_id = assistant_thread_file.read().strip()
+    except FileNotFoundError:
+        pass
+
+    assistant_thread = None
+    if thread_id:
+        try:
+            assistant_thread = openai_client.beta.threads.retrieve(thread_id)
+            logging.info(f"Resuming assistant thread: {assistant_thread.id}")
+        except NotFoundError:
+            logging.info(f"Assistant thread {thread_id} no longer exists")
+
+    if assistant_thread is None:
+        assistant_thread = openai_client.beta.threads.create()
+        logging.info(f"Assistant thread created: {assistant_thread.id}")
+        with open(path, "w") as assistant_thread_file:
+            assistant_thread_file.write(assistant_thread.id)
+    return assistant_thread
+
+
 def whisper_text_to_speech(openai_client: OpenAI, text_to_say: str) -> None:
     """
     Text to speech using OpenAI's Whisper API.
     """
     try:
         logging.info(f"Generating speech for text (length: {len(text_to_say)} chars)")
-        speech_file_path = Path(__file__).parent / "speech.mp3"
-        response = openai_client.audio.speech.create(model="tts-1", voice="nova", input=text_to_say)
-        response.stream_to_file(speech_file_path)
-        logging.info(f"Speech file saved to: {speech_file_path}")
-        helpers.play_audio(speech_file_path)
+        # Play the speech while it's still downloading instead of saving it
+        # to speech.mp3 first
+        with openai_client.audio.speech.with_streaming_response.create(
+            model="tts-1", voice="nova", input=text_to_say, response_format=TTS_RESPONSE_FORMAT
+        ) as response:
+            helpers.play_audio_stream(response.iter_bytes(TTS_STREAM_CHUNK_BYTES))
     except Exception as e:
         logging.error(f"Failed to generate speech: {e}")
         raise
@@ -76,45 +161,192 @@ def generate_chatgpt_image(
 
         # Download the image with timeout
         logging.info("Downloading generated image...")
-        response = requests.get(image_url, stream=True, timeout=NETWORK_TIMEOUT_SECONDS)
+        response = http_session.SESSION.get(image_url, timeout=NETWORK_TIMEOUT_SECONDS)
         if response.ok:
-            # Process image directly from stream without saving twice
             logging.info(f"Resizing image to {IMAGE_WIDTH}x{IMAGE_HEIGHT}")
 
-            # Read image data into memory
-            image_data = BytesIO()
-            response.raw.decode_content = True
-            shutil.copyfileobj(response.raw, image_data)
-            image_data.seek(0)
-
-            # Open and resize image from memory
-            image = Image.open(image_data)
+            # The body is read into memory once and both decoders work on
+            # that buffer directly, without copying it again.
+            image_bytes = response.content
 
-            # Save original for archival/sending
-            image.save("dalle_image.png")
+            # Downscale for display, preferring libvips when it's installed
+            resized = False
+            if pyvips is not None:
+                try:
+                    _resize_with_vips(image_bytes)
+                    resized = True
+                except Exception as e:
+                    logging.warning(f"libvips resize failed, falling back to Pillow: {e}")
+            if not resized:
+                _resize_with_pillow(image_bytes)
+            os.replace(DISPLAY_IMAGE_TEMP_PATH, DISPLAY_IMAGE_PATH)
 
-            # Resize for display
-            resized_image = image.resize((IMAGE_WIDTH, IMAGE_HEIGHT))
-            resized_image.save("resized.png")
+            # Keep the original in memory for archival/sending. DALL-E
+            # already returns a PNG, so it never needs re-encoding.
+            global _last_image
+            _last_image = image_bytes
 
             logging.info("Image downloaded, resized and saved")
-            helpers.display_image("resized.png")
+            if _shut_down:
+                logging.info("Shutting down, not displaying DALL-E image")
+            else:
+                helpers.display_image(DISPLAY_IMAGE_PATH)
         else:
             logging.error(f"Failed to download image: HTTP {response.status_code}")
     except Exception as e:
         logging.error(f"Error generating DALL-E image: {e}", exc_info=True)
 
 
+def shutdown() -> None:
+    """
+    Stops the DALL-E and speech workers on exit. Queued jobs are dropped, and
+    an image that is still being generated isn't displayed.
+    """
+    global _shut_down
+    _shut_down = True
+    for executor in (_image_executor, _speech_executor):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _resize_with_vips(image_bytes: bytes) -> None:
+    """
+    Writes the display copy using libvips. thumbnail_buffer fuses decode,
+    shrink and Lanczos into one streamed pipeline, so the full-size image is
+    never materialised in memory.
+    """
+    resized_image = pyvips.Image.thumbnail_buffer(image_bytes, IMAGE_WIDTH, height=IMAGE_HEIGHT)
+    resized_image.pngsave(DISPLAY_IMAGE_TEMP_PATH, compression=DISPLAY_IMAGE_COMPRESS_LEVEL)
+
+
+def _resize_with_pillow(image_bytes: bytes) -> None:
+    """
+    Writes the display copy using Pillow.
+    """
+    # BytesIO shares the bytes object's buffer until it's written to
+    image = Image.open(BytesIO(image_bytes))
+
+    # Downscale for display. thumbnail() keeps the aspect ratio and
+    # pre-reduces before filtering, and BILINEAR is indistinguishable from
+    # LANCZOS on an 800x480 panel at a fraction of the cost.
+    image.thumbnail((IMAGE_WIDTH, IMAGE_HEIGHT), Image.Resampling.BILINEAR)
+    image.save(DISPLAY_IMAGE_TEMP_PATH, optimize=False, compress_level=DISPLAY_IMAGE_COMPRESS_LEVEL)
+
+
+def save_original_image(path: str = ORIGINAL_IMAGE_PATH) -> bool:
+    """
+    Writes the most recent full-size DALL-E image to disk. The downloaded
+    PNG bytes are written as they are, so there's no decode or re-encode,
+    and only when the image is actually sent.
+
+    Returns True if an image was written, False if none has been generated
+    since startup.
+    """
+    image_bytes = _last_image
+    if image_bytes is None:
+        logging.info("No DALL-E image generated yet, nothing to save")
+        return False
+
+    try:
+        with open(path, "wb") as image_file:
+            image_file.write(image_bytes)
+        logging.info(f"Saved original DALL-E image to {path}")
+        return True
+    except Exception as e:
+        logging.error(f"Failed to save original DALL-E image: {e}")
+        return False
+
+
+def _stream_run(
+    openai_client: OpenAI,
+    assistant: Assistant,
+    assistant_thread_id: str,
+    on_sentences: Callable[[str], None],
+) -> Tuple[str, str, bool]:
+    """
+    Runs the assistant on the thread and streams its reply, passing complete
+    sentences to on_sentences as soon as they arrive.
+
+    Returns:
+        The whole reply, the trailing text not yet passed on, and whether the
+        run completed
+    """
+    logging.info("Streaming assistant run...")
+    started = time.monotonic()
+    output = ""
+    pending = ""
+    run_id = None
+    try:
+        # The timeout applies to each read, so a stream that goes quiet is
+        # given up on too, not only one that keeps sending events
+        with openai_client.beta.threads.runs.stream(
+            thread_id=assistant_thread_id,
+            assistant_id=assistant.id,
+            timeout=ASSISTANT_TIMEOUT_SECONDS,
+        ) as stream:
+            for event in stream:
+                if event.event == ASSISTANT_CREATED_EVENT:
+                    run_id = event.data.id
+                if event.event == ASSISTANT_COMPLETED_EVENT:
+                    logging.info(f"Assistant run completed after {time.monotonic() - started:.2f}s")
+                    return output, pending, True
+                if event.event in ASSISTANT_FAILED_EVENTS:
+                    logging.error(f"Assistant run ended with event: {event.event}")
+                    return output, pending, False
+                if time.monotonic() - started >= ASSISTANT_TIMEOUT_SECONDS:
+                    logging.warning(f"Assistant timeout exceeded ({ASSISTANT_TIMEOUT_SECONDS}s)")
+                    break
+                if event.event != "thread.message.delta":
+                    continue
+
+                for content in event.data.delta.content or []:
+                    if content.type == "text" and content.text and content.text.value:
+                        output += content.text.value
+                        pending += content.text.value
+
+                # Pass on everything up to the last sentence boundary, once
+                # there's enough of it to be worth a speech request
+                sentences = _SENTENCE_END_RE.split(pending)
+                if len(sentences) > 1:
+                    complete = " ".join(sentences[:-1])
+                    if len(complete) >= SPEECH_MIN_SENTENCE_CHARS:
+                        on_sentences(complete)
+                        pending = sentences[-1]
+            else:
+                logging.warning("Assistant stream ended before the run completed")
+    except (APITimeoutError, APIConnectionError) as e:
+        logging.warning(f"Assistant stream failed: {e}")
+
+    _cancel_run(openai_client, assistant_thread_id, run_id)
+    return output, pending, False
+
+
+def _cancel_run(openai_client: OpenAI, assistant_thread_id: str, run_id: Optional[str]) -> None:
+    """
+    Cancels a run that was given up on, as the thread doesn't accept new
+    messages while it has an active run.
+    """
+    if run_id is None:
+        return
+    try:
+        openai_client.beta.threads.runs.cancel(run_id=run_id, thread_id=assistant_thread_id)
+        logging.info(f"Cancelled assistant run {run_id}")
+    except Exception as e:
+        logging.warning(f"Unable to cancel assistant run {run_id}: {e}")
+
+
 def send_to_assistant(
     openai_client: OpenAI,
     assistant: Assistant,
     assistant_thread_id: str,
     input_text: str,
     text_to_speech: bool = True,
-) -> None:
+) -> Future:
     """
     Send text to an OpenAI Assistant and gets the response to pass to Whisper
     and Dall-E.
+
+    Returns the Future of the background Dall-E image generation, so callers
+    can wait for it to finish (e.g. on shutdown).
     """
     try:
         logging.info(f"Sending message to assistant. Thread: {assistant_thread_id}")
@@ -131,54 +363,41 @@ def send_to_assistant(
             thread_id=assistant_thread_id, role="user", content=amended_input_text
         )
 
-        logging.info("Creating assistant run...")
-        run = openai_client.beta.threads.runs.create(
-            thread_id=assistant_thread_id,
-            assistant_id=assistant.id,
-        )
+        speech_futures = []
 
-        run_completed = False
-        timeout_limit = ASSISTANT_TIMEOUT_SECONDS
-        timeout_counter = 0
-        while not run_completed:
-            if timeout_counter >= timeout_limit:
-                logging.warning(f"Assistant timeout exceeded ({timeout_limit}s)")
-                break
-            run = openai_client.beta.threads.runs.retrieve(
-                thread_id=assistant_thread_id,
-                run_id=run.id,
-            )
-            if run.status == "completed":
-                run_completed = True
-                logging.info("Assistant run completed successfully")
-            time.sleep(1)
-            timeout_counter += 1
-
-        if timeout_counter >= timeout_limit:
-            assistant_output = (
-                "Sorry, it looks like something went wrong. Try again in a moment or two."
-            )
+        def speak(text: str) -> None:
+            if text_to_speech and text.strip():
+                speech_futures.append(
+                    _speech_executor.submit(whisper_text_to_speech, openai_client, text.strip())
+                )
+
+        assistant_output, unspoken, run_completed = _stream_run(
+            openai_client, assistant, assistant_thread_id, speak
+        )
+        if run_completed:
+            speak(unspoken)
         else:
-            thread_messages = openai_client.beta.threads.messages.list(assistant_thread_id)
-            # The most recent assistant's response will be the first item in the list
-            assistant_output = thread_messages.data[0].content[0].text.value
+            assistant_output = ASSISTANT_ERROR_RESPONSE
+            speak(assistant_output)
 
         logging.info(f"Assistant response (length: {len(assistant_output)} chars)")
         logging.debug(f"Assistant output: {assistant_output}")
 
-        global image_thread
-        logging.info("Starting background image generation thread...")
-        image_thread = threading.Thread(
-            target=generate_chatgpt_image,
-            args=(openai_client, input_text, assistant_output),
+        logging.info("Starting background image generation...")
+        image_future = _image_executor.submit(
+            generate_chatgpt_image, openai_client, input_text, assistant_output
         )
-        image_thread.start()
 
         if text_to_speech:
-            whisper_text_to_speech(openai_client, assistant_output)
+            # Return once the whole reply has been spoken, so the microphone
+            # doesn't pick it up
+            for speech_future in speech_futures:
+                speech_future.result()
         else:
             logging.info("Skipping text-to-speech as requested")
 
+        return image_future
+
     except Exception as e:
         logging.error(f"Error in send_to_assistant: {e}", exc_info=True)
         raise
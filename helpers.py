@@ -1,81 +1,478 @@
 import vlc
+import ctypes
+import numpy
 import subprocess
-import time
+import threading
 import logging
 import os
+import re
+from collections import OrderedDict
+from PIL import Image, ImageOps
+from typing import Dict, Iterable, Optional, Tuple
 
-# Track the fbi process for better cleanup
-_fbi_process = None
+try:
+    import sounddevice
+    import soundfile
+except (ImportError, OSError):
+    # Preloaded cues need both PortAudio and libsndfile, VLC plays everything
+    # when either is missing
+    sounddevice = None
+    soundfile = None
+
+# Upper bound on how long to wait for a clip to finish playing
+PLAYBACK_TIMEOUT_SECONDS = 120
+
+# How long fbi gets to exit after SIGTERM before sudo is killed. wait()
+# returns as soon as fbi exits, so this only matters when it hangs.
+FBI_TERMINATE_TIMEOUT_SECONDS = 0.5
+
+FRAMEBUFFER_DEVICE = "/dev/fb0"
+FRAMEBUFFER_SYSFS_DIR = "/sys/class/graphics/fb0"
+# Encoded frames kept in memory, around 1.5MB each at 800x480 and 32 bpp
+FRAME_CACHE_SIZE = 8
+
+# One VLC instance is shared by every clip. Parsed media are cached by path
+# along with the file's mtime, so the short audio cues are only opened and
+# probed once while files that get rewritten are picked up again.
+_vlc_instance = None
+_media_cache: Dict[str, Tuple[float, "vlc.Media"]] = {}
+
+# Short audio cues decoded to PCM once by preload_audio(), keyed by path, as
+# (samples, sample rate)
+_preloaded_audio: Dict[str, Tuple[numpy.ndarray, int]] = {}
+
+# The framebuffer is opened once on first use; None if it isn't writable, in
+# which case images are shown with fbi instead
+_framebuffer = None
+_framebuffer_checked = False
+
+# display_image is called from both the main loop and image workers
+_display_lock = threading.Lock()
+# Set by cleanup_display(), after which nothing more is shown, so a worker
+# finishing during shutdown doesn't start fbi again
+_display_closed = False
+
+
+class Framebuffer:
+    """
+    Writes images straight to a Linux framebuffer device, which stays open
+    between images instead of spawning (and killing) fbi for each one.
+    """
+
+    def __init__(
+        self, device: str = FRAMEBUFFER_DEVICE, sysfs_dir: str = FRAMEBUFFER_SYSFS_DIR
+    ) -> None:
+        self.width, self.height = self._read_size(sysfs_dir)
+        self.bits_per_pixel = int(self._read_sysfs(sysfs_dir, "bits_per_pixel"))
+        if self.bits_per_pixel not in (16, 24, 32):
+            raise ValueError(f"Unsupported framebuffer depth: {self.bits_per_pixel} bpp")
+
+        row_bytes = self.width * self.bits_per_pixel // 8
+        try:
+            self.stride = int(self._read_sysfs(sysfs_dir, "stride"))
+        except OSError:
+            self.stride = row_bytes
+        self._row_padding = b"\x00" * (self.stride - row_bytes)
+
+        self._device = open(device, "r+b", buffering=0)
+        # Encoded frames by image path, least recently shown first, so the
+        # same few images aren't decoded and scaled on every state change
+        self._frames: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    @staticmethod
+    def _read_sysfs(sysfs_dir: str, name: str) -> str:
+        with open(os.path.join(sysfs_dir, name)) as sysfs_file:
+            return sysfs_file.read().strip()
+
+    @classmethod
+    def _read_size(cls, sysfs_dir: str) -> Tuple[int, int]:
+        """
+        Returns the visible resolution. The current mode (e.g. "U:800x480p-0")
+        is preferred, since virtual_size can be taller when double buffering.
+        """
+        try:
+            modes = cls._read_sysfs(sysfs_dir, "modes")
+            match = re.search(r"(\d+)x(\d+)", modes)
+            if match:
+                return int(match.group(1)), int(match.group(2))
+        except OSError:
+            pass
+        width, height = cls._read_sysfs(sysfs_dir, "virtual_size").split(",")
+        return int(width), int(height)
+
+    def encode(self, image: Image.Image) -> bytes:
+        """
+        Converts an image to the framebuffer's size and raw pixel format.
+        """
+        image = image.convert("RGB")
+        if image.size != (self.width, self.height):
+            # Scale to fit and letterbox with black, like fbi does, rather
+            # than stretching e.g. the square DALL-E images across the screen
+            image = ImageOps.pad(
+                image, (self.width, self.height), Image.Resampling.BILINEAR, color=(0, 0, 0)
+            )
+
+        if self.bits_per_pixel == 32:
+            data = image.tobytes("raw", "BGRX")
+        elif self.bits_per_pixel == 24:
+            data = image.tobytes("raw", "BGR")
+        else:
+            # Pillow has no RGB565 packer, so pack with numpy
+            rgb = numpy.asarray(image, dtype=numpy.uint16)
+            rgb565 = ((rgb[..., 0] >> 3) << 11) | ((rgb[..., 1] >> 2) << 5) | (rgb[..., 2] >> 3)
+            data = rgb565.astype("<u2").tobytes()
+
+        if self._row_padding:
+            row_bytes = len(data) // self.height
+            data = b"".join(
+                data[offset : offset + row_bytes] + self._row_padding
+                for offset in range(0, len(data), row_bytes)
+            )
+        return data
+
+    def frame(self, image_file_path: str) -> bytes:
+        """
+        Returns an image file encoded for the framebuffer, decoding it only if
+        it isn't cached or has changed on disk since.
+        """
+        mtime = os.path.getmtime(image_file_path)
+        cached = self._frames.get(image_file_path)
+        if cached is not None and cached[0] == mtime:
+            self._frames.move_to_end(image_file_path)
+            return cached[1]
+
+        with Image.open(image_file_path) as image:
+            data = self.encode(image)
+        self._frames[image_file_path] = (mtime, data)
+        self._frames.move_to_end(image_file_path)
+        while len(self._frames) > FRAME_CACHE_SIZE:
+            self._frames.popitem(last=False)
+        return data
+
+    def show(self, image_file_path: str) -> None:
+        """
+        Writes an image file to the framebuffer.
+        """
+        data = self.frame(image_file_path)
+        self._device.seek(0)
+        self._device.write(data)
+
+    def close(self) -> None:
+        self._device.close()
+
+
+class FbiDisplay:
+    """
+    Shows images with the console framebuffer imageviewer (fbi), keeping
+    track of the fbi process so it can be stopped before the next image.
+    """
+
+    def __init__(self) -> None:
+        self._process: Optional[subprocess.Popen] = None
+
+    def show(self, abs_path: str) -> None:
+        """
+        Displays an image with fbi, replacing the image currently shown
+        """
+        try:
+            # Remove the current image by terminating tracked process
+            self.stop()
+
+            # Display the new image and track the process
+            self._process = subprocess.Popen(
+                ["sudo", "fbi", "-T", "1", abs_path, "--noverbose"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            logging.debug(f"Started new fbi process (PID: {self._process.pid})")
+        except Exception as e:
+            logging.error(f"Error displaying image: {e}")
+
+    def is_running(self) -> bool:
+        """
+        Returns whether the tracked fbi process is still running.
+        """
+        return self._process is not None and self._process.poll() is None
+
+    def stop(self) -> None:
+        """
+        Stops the tracked fbi process, if it's still running.
+
+        fbi runs under sudo, which relays SIGTERM to it, so that's tried first.
+        SIGKILL can't be relayed (it would only kill sudo and leave fbi holding
+        the console), so sudo is only killed if fbi doesn't exit in time.
+        """
+        if not self.is_running():
+            return
+
+        process = self._process
+        logging.debug(f"Terminating existing fbi process (PID: {process.pid})")
+        process.terminate()
+        try:
+            process.wait(timeout=FBI_TERMINATE_TIMEOUT_SECONDS)
+        except subprocess.TimeoutExpired:
+            logging.warning("fbi process did not terminate, killing it")
+            process.kill()
+            # Reap it so it doesn't linger as a zombie
+            process.wait()
+
+
+# Used by display_image when the framebuffer can't be written directly
+_fbi_display = FbiDisplay()
+
+
+def _get_framebuffer() -> Optional[Framebuffer]:
+    """
+    Returns the shared Framebuffer, opening it on first use. Returns None if
+    the framebuffer can't be used (missing device, no permission, or an
+    unsupported pixel format).
+    """
+    global _framebuffer, _framebuffer_checked
+    if not _framebuffer_checked:
+        _framebuffer_checked = True
+        try:
+            _framebuffer = Framebuffer()
+            logging.info(
+                f"Writing images directly to {FRAMEBUFFER_DEVICE} "
+                f"({_framebuffer.width}x{_framebuffer.height}, "
+                f"{_framebuffer.bits_per_pixel} bpp)"
+            )
+        except (OSError, ValueError) as e:
+            logging.info(f"Framebuffer not available ({e}), using fbi to display images")
+    return _framebuffer
+
+
+def _get_vlc_instance() -> "vlc.Instance":
+    """
+    Returns the shared VLC instance, creating it on first use.
+    """
+    global _vlc_instance
+    if _vlc_instance is None:
+        _vlc_instance = vlc.Instance("--quiet")
+    return _vlc_instance
+
+
+def _get_media(audio_file_path: str) -> "vlc.Media":
+    """
+    Returns the cached VLC media for a file, creating it on first use or if
+    the file has changed since.
+    """
+    mtime = os.path.getmtime(audio_file_path)
+    cached = _media_cache.get(audio_file_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    media = _get_vlc_instance().media_new(audio_file_path)
+    if cached is not None:
+        cached[1].release()
+    _media_cache[audio_file_path] = (mtime, media)
+    return media
+
+
+class AudioStream:
+    """
+    Feeds audio to VLC from chunks of bytes as they arrive (e.g. from a
+    streaming HTTP response), so playback can start before the whole clip
+    has been downloaded and nothing is written to disk.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._buffer = bytearray()
+        self._position = 0
+        self._finished = False
+        self._condition = threading.Condition()
+        self._feeder = threading.Thread(
+            target=self._feed, args=(chunks,), name="audio-stream", daemon=True
+        )
+        # VLC calls back into this from its input thread, so the ctypes
+        # wrapper has to stay referenced for as long as the media exists
+        self.read_cb = vlc.CallbackDecorators.MediaReadCb(self._read)
+
+    def start(self) -> None:
+        self._feeder.start()
+
+    def _feed(self, chunks: Iterable[bytes]) -> None:
+        try:
+            for chunk in chunks:
+                with self._condition:
+                    self._buffer += chunk
+                    self._condition.notify_all()
+        except Exception as e:
+            logging.error(f"Error streaming audio: {e}")
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    def _read(self, opaque: Optional[int], buffer: "ctypes._Pointer", length: int) -> int:
+        """
+        Copies up to length bytes into VLC's buffer, blocking until more data
+        has arrived. Returns 0 at the end of the stream.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._finished or self._position < len(self._buffer))
+            data = bytes(self._buffer[self._position : self._position + length])
+            self._position += len(data)
+        ctypes.memmove(buffer, data, len(data))
+        return len(data)
+
+
+def preload_audio(audio_file_paths: Iterable[str]) -> None:
+    """
+    Decodes short audio cues to PCM up front, so play_audio() can send them
+    straight to the sound card instead of having VLC open and decode the
+    file each time. Files that can't be decoded are left to VLC.
+    """
+    if sounddevice is None:
+        logging.info("sounddevice/soundfile not available, audio cues will be played with VLC")
+        return
+
+    for audio_file_path in audio_file_paths:
+        try:
+            samples, sample_rate = soundfile.read(audio_file_path, dtype="int16", always_2d=True)
+            _preloaded_audio[audio_file_path] = (samples, sample_rate)
+        except Exception as e:
+            logging.warning(f"Unable to preload {audio_file_path}, using VLC for it: {e}")
+    logging.info(f"Preloaded {len(_preloaded_audio)} audio cues")
 
 
 def play_audio(audio_file_path: str) -> None:
     """
     Plays a given audio file and waits until it's finished playing
     """
+    preloaded = _preloaded_audio.get(audio_file_path)
+    if preloaded is not None:
+        try:
+            logging.info(f"Playing preloaded audio: {audio_file_path}")
+            samples, sample_rate = preloaded
+            sounddevice.play(samples, sample_rate)
+            sounddevice.wait()
+            return
+        except Exception as e:
+            logging.error(f"Error playing preloaded audio, falling back to VLC: {e}")
+
     if not os.path.exists(audio_file_path):
         logging.error(f"Audio file not found: {audio_file_path}")
         return
 
     try:
         logging.info(f"Playing audio: {audio_file_path}")
-        player = vlc.MediaPlayer(audio_file_path)
-        player.play()
-        time.sleep(1)
-        # Ensure the program doesn't cut off the text to speech
-        while player.is_playing():
-            time.sleep(1)
-        logging.debug("Audio playback completed")
+        _play_media(_get_media(audio_file_path), audio_file_path)
     except Exception as e:
         logging.error(f"Error playing audio: {e}")
 
 
-def display_image(image_file_path: str) -> None:
+def play_audio_stream(chunks: Iterable[bytes]) -> None:
+    """
+    Plays audio as it's streamed in and waits until it's finished playing
+    """
+    media = None
+    try:
+        logging.info("Playing audio stream")
+        stream = AudioStream(chunks)
+        media = _get_vlc_instance().media_new_callbacks(None, stream.read_cb, None, None, None)
+        stream.start()
+        _play_media(media, "audio stream")
+    except Exception as e:
+        logging.error(f"Error playing audio: {e}")
+    finally:
+        if media is not None:
+            media.release()
+
+
+def _play_media(media: "vlc.Media", description: str) -> None:
+    """
+    Plays a VLC media on a new player and waits for it to finish.
+    """
+    player = _get_vlc_instance().media_player_new()
+    try:
+        player.set_media(media)
+
+        # Wait for VLC to report the end of the clip rather than polling
+        # is_playing(), which added up to a second of silence per clip
+        finished = threading.Event()
+        events = player.event_manager()
+        for event_type in (
+            vlc.EventType.MediaPlayerEndReached,
+            vlc.EventType.MediaPlayerEncounteredError,
+        ):
+            events.event_attach(event_type, lambda event: finished.set())
+
+        if player.play() == -1:
+            logging.error(f"Unable to start playback: {description}")
+            return
+
+        # Ensure the program doesn't cut off the text to speech
+        if not finished.wait(timeout=PLAYBACK_TIMEOUT_SECONDS):
+            logging.warning(f"Audio playback timed out after {PLAYBACK_TIMEOUT_SECONDS}s")
+        logging.debug("Audio playback completed")
+    finally:
+        player.release()
+
+
+def preload_images(image_file_paths: Iterable[str]) -> None:
     """
-    Displays an image to the console framebuffer imageviewer (fbi)
+    Decodes images that are shown often, like the listening and thinking
+    screens, so showing them is a single write to the framebuffer.
     """
-    global _fbi_process
+    with _display_lock:
+        if _display_closed:
+            return
+        framebuffer = _get_framebuffer()
+        if framebuffer is None:
+            return
+        for image_file_path in image_file_paths:
+            try:
+                framebuffer.frame(os.path.abspath(image_file_path))
+            except Exception as e:
+                logging.warning(f"Unable to preload image {image_file_path}: {e}")
 
+
+def display_image(image_file_path: str) -> None:
+    """
+    Displays an image on the framebuffer, either by writing to it directly or
+    through the console framebuffer imageviewer (fbi)
+    """
     # Validate that the file exists and is within allowed directories
     if not os.path.exists(image_file_path):
         logging.error(f"Image file not found: {image_file_path}")
         return
 
-    try:
+    with _display_lock:
+        if _display_closed:
+            logging.info(f"Display closed, not showing {image_file_path}")
+            return
+
         # Get absolute path to prevent directory traversal
         abs_path = os.path.abspath(image_file_path)
         logging.info(f"Displaying image: {abs_path}")
 
-        # Remove the current image by terminating tracked process
-        if _fbi_process and _fbi_process.poll() is None:
-            # Process is still running, terminate it
-            logging.debug(f"Terminating existing fbi process (PID: {_fbi_process.pid})")
-            _fbi_process.terminate()
+        framebuffer = _get_framebuffer()
+        if framebuffer is not None:
             try:
-                _fbi_process.wait(timeout=2)
-            except subprocess.TimeoutExpired:
-                logging.warning("fbi process did not terminate, killing it")
-                _fbi_process.kill()
-
-        # Display the new image and track the process
-        _fbi_process = subprocess.Popen(
-            ["sudo", "fbi", "-T", "1", abs_path, "--noverbose"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        logging.debug(f"Started new fbi process (PID: {_fbi_process.pid})")
-    except Exception as e:
-        logging.error(f"Error displaying image: {e}")
+                framebuffer.show(abs_path)
+                return
+            except Exception as e:
+                logging.error(f"Error writing image to framebuffer: {e}")
+
+        _fbi_display.show(abs_path)
 
 
 def cleanup_display() -> None:
-    """Clean up the fbi display process on shutdown"""
-    global _fbi_process
-    if _fbi_process and _fbi_process.poll() is None:
-        logging.info("Cleaning up display process...")
-        try:
-            _fbi_process.terminate()
-            _fbi_process.wait(timeout=2)
-        except subprocess.TimeoutExpired:
-            _fbi_process.kill()
-        except Exception as e:
-            logging.error(f"Error cleaning up display: {e}")
+    """Clean up the framebuffer and fbi display process on shutdown"""
+    global _framebuffer, _display_closed
+    # Waits for an image that's being written to finish
+    with _display_lock:
+        _display_closed = True
+        if _framebuffer is not None:
+            try:
+                _framebuffer.close()
+            except Exception as e:
+                logging.error(f"Error closing framebuffer: {e}")
+            _framebuffer = None
+        if _fbi_display.is_running():
+            logging.info("Cleaning up display process...")
+            try:
+                _fbi_display.stop()
+            except Exception as e:
+                logging.error(f"Error cleaning up display: {e}")
@@ -0,0 +1,137 @@
+import ctypes
+import logging
+import queue
+import threading
+from typing import Any, Optional
+
+# Private attributes of pvporcupine.Porcupine and pvrecorder.PvRecorder used
+# to pass frames between them without going through Python lists
+_PORCUPINE_ATTRIBUTES = (
+    "_handle",
+    "_process_func",
+    "PicovoiceStatuses",
+    "_PICOVOICE_STATUS_TO_EXCEPTION",
+    "_get_error_stack",
+)
+_RECORDER_ATTRIBUTES = (
+    "_handle",
+    "_read_func",
+    "PvRecorderStatuses",
+    "_PVRECORDER_STATUS_TO_EXCEPTION",
+)
+# How often the idle listener thread checks whether it's been stopped
+LISTENER_IDLE_POLL_SECONDS = 0.1
+# How long stop() waits for the listener thread to finish its last frame
+LISTENER_STOP_TIMEOUT_SECONDS = 1
+
+
+class HotwordDetector:
+    """
+    Feeds microphone frames to Porcupine. Each frame is read into one reused
+    C buffer that is handed straight to Porcupine, rather than being
+    converted to a list of Python ints by PvRecorder.read() and back to a C
+    array by Porcupine.process() around 30 times a second while idle.
+    """
+
+    def __init__(self, handle: Any, recorder: Any) -> None:
+        self._handle = handle
+        self._recorder = recorder
+        self._buffer = (ctypes.c_int16 * handle.frame_length)()
+        self._result = ctypes.c_int()
+
+        self._direct = all(hasattr(handle, name) for name in _PORCUPINE_ATTRIBUTES) and all(
+            hasattr(recorder, name) for name in _RECORDER_ATTRIBUTES
+        )
+        if not self._direct:
+            logging.info("Porcupine/PvRecorder internals not found, using read() and process()")
+
+    def process_next_frame(self) -> int:
+        """
+        Reads the next frame from the recorder and returns the index of the
+        detected keyword, or -1 if there wasn't one.
+        """
+        if not self._direct:
+            return self._handle.process(self._recorder.read())
+
+        recorder = self._recorder
+        status = recorder._read_func(recorder._handle, self._buffer)
+        if status is not recorder.PvRecorderStatuses.SUCCESS:
+            raise recorder._PVRECORDER_STATUS_TO_EXCEPTION[status]("Failed to read from device.")
+
+        handle = self._handle
+        status = handle._process_func(handle._handle, self._buffer, ctypes.byref(self._result))
+        if status is not handle.PicovoiceStatuses.SUCCESS:
+            raise handle._PICOVOICE_STATUS_TO_EXCEPTION[status](
+                message="Processing failed", message_stack=handle._get_error_stack()
+            )
+        return self._result.value
+
+
+class HotwordListener:
+    """
+    Listens for the hotword on a background thread, so the main thread can
+    block until it's heard instead of polling the microphone itself.
+
+    The recorder is stopped as soon as the hotword is detected, releasing
+    the microphone for speech recognition, and started again by listen().
+    """
+
+    def __init__(self, detector: HotwordDetector, recorder: Any) -> None:
+        self._detector = detector
+        self._recorder = recorder
+        # Keyword indexes, or the exception that stopped the thread
+        self._detections: "queue.Queue[Any]" = queue.Queue()
+        self._listening = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hotword", daemon=True)
+
+    def listen(self) -> None:
+        """
+        Starts the recorder and listens for the hotword.
+        """
+        self._recorder.start()
+        self._listening.set()
+        if not self._thread.is_alive():
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Blocks until the hotword is heard and returns the index of the
+        detected keyword.
+
+        Raises:
+            queue.Empty: If the timeout expired first
+            Exception: Whatever stopped the recorder or Porcupine
+        """
+        detection = self._detections.get(timeout=timeout)
+        if isinstance(detection, Exception):
+            raise detection
+        return detection
+
+    def stop(self) -> None:
+        """
+        Stops the listener thread. The recorder and Porcupine handle are left
+        for the caller to delete.
+        """
+        self._stopped.set()
+        self._listening.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=LISTENER_STOP_TIMEOUT_SECONDS)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            if not self._listening.wait(timeout=LISTENER_IDLE_POLL_SECONDS):
+                continue
+            if self._stopped.is_set():
+                break
+            try:
+                result = self._detector.process_next_frame()
+                if result >= 0:
+                    self._listening.clear()
+                    self._recorder.stop()
+                    self._detections.put(result)
+            except Exception as e:
+                logging.error(f"Hotword listener stopped: {e}")
+                self._listening.clear()
+                self._detections.put(e)
+                return
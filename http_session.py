@@ -0,0 +1,36 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Constants
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.3
+RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+
+def create_session() -> requests.Session:
+    """
+    Creates a requests Session with a pooled, retrying adapter mounted for
+    both http and https, so repeated downloads and renders reuse
+    keep-alive connections instead of paying a new TCP/TLS handshake.
+    """
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_FORCELIST,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared session for all plain HTTP traffic
+SESSION = create_session()
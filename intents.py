@@ -0,0 +1,148 @@
+import re
+from typing import Iterable, Optional
+
+try:
+    import ahocorasick
+except ImportError:
+    # pyahocorasick is optional, the compiled regexes are used without it
+    ahocorasick = None
+
+# Local commands recognised in the user's speech
+CANCEL = "cancel"
+SEND_IMAGE = "send_image"
+MAKE_ANOTHER = "make_another"
+SHOW_RANDOM_IMAGE = "show_random_image"
+MAKE_IMAGE = "make_image"
+
+# List of phrases to cancel the conversation before making requests to
+# ChatGPT
+CANCEL_PHRASES = (
+    "nevermind",
+    "thanks",
+    "never mind",
+    "stop",
+    "cancel that",
+    "cancel",
+    "nothing",
+    "forget it",
+)
+
+# List of phrases to send the dall-e image to telegram
+SEND_IMAGE_PHRASES = (
+    "send",
+    "telegram",
+)
+
+# List of phrases to generate another image from the last Stable Diffusion
+# prompt
+MAKE_ANOTHER_PHRASES = (
+    "make another",
+    "make more",
+)
+
+# List of phrases to display a random image from the saved images folder
+SHOW_RANDOM_IMAGE_PHRASES = ("random",)
+
+# List of phrases to generate an image with Stable Diffusion
+MAKE_IMAGE_PHRASES = ("make image",)
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    """
+    Returns phrases as a regex alternation. Longer phrases come first so
+    "cancel that" is preferred over "cancel".
+    """
+    return "|".join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+
+
+def _compile(phrases: Iterable[str]) -> "re.Pattern[str]":
+    """
+    Compiles phrases into a single alternation, matched on word boundaries so
+    e.g. "cancel" doesn't fire on "cancellation".
+    """
+    return re.compile(rf"\b(?:{_alternation(phrases)})\b", re.IGNORECASE)
+
+
+# Checked in order, the first intent that matches wins
+PHRASES = (
+    (CANCEL, CANCEL_PHRASES),
+    (SEND_IMAGE, SEND_IMAGE_PHRASES),
+    (MAKE_ANOTHER, MAKE_ANOTHER_PHRASES),
+    (SHOW_RANDOM_IMAGE, SHOW_RANDOM_IMAGE_PHRASES),
+    (MAKE_IMAGE, MAKE_IMAGE_PHRASES),
+)
+PATTERNS = tuple((intent, _compile(phrases)) for intent, phrases in PHRASES)
+_PATTERNS_BY_INTENT = dict(PATTERNS)
+_PRIORITY = {intent: priority for priority, (intent, _) in enumerate(PHRASES)}
+# Every command in one pattern, with a named group per command, so speech
+# meant for the assistant is rejected in one scan rather than one per command
+_COMBINED_PATTERN = re.compile(
+    r"\b(?:"
+    + "|".join(f"(?P<{intent}>{_alternation(phrases)})" for intent, phrases in PHRASES)
+    + r")\b",
+    re.IGNORECASE,
+)
+
+
+def _build_automaton() -> "ahocorasick.Automaton":
+    """
+    Builds one Aho-Corasick automaton over every command phrase, so the
+    speech is scanned once for all commands instead of once per command.
+    """
+    automaton = ahocorasick.Automaton()
+    for intent, phrases in PHRASES:
+        for phrase in phrases:
+            automaton.add_word(phrase, (intent, len(phrase)))
+    automaton.make_automaton()
+    return automaton
+
+
+_automaton = _build_automaton() if ahocorasick is not None else None
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _classify_with_automaton(text: str) -> Optional[str]:
+    """
+    Returns the highest priority command with a phrase in the text, matching
+    whole words only like the regex patterns.
+    """
+    text = text.lower()
+    best = None
+    for end, (intent, length) in _automaton.iter(text):
+        start = end - length + 1
+        if start > 0 and _is_word_char(text[start - 1]):
+            continue
+        if end + 1 < len(text) and _is_word_char(text[end + 1]):
+            continue
+        if best is None or _PRIORITY[intent] < _PRIORITY[best]:
+            best = intent
+    return best
+
+
+def classify(text: str) -> Optional[str]:
+    """
+    Returns the local command in the recognised speech, or None if it should
+    be sent to the assistant.
+    """
+    if _automaton is not None:
+        return _classify_with_automaton(text)
+
+    best = None
+    for match in _COMBINED_PATTERN.finditer(text):
+        intent = match.lastgroup
+        if best is None or _PRIORITY[intent] < _PRIORITY[best]:
+            best = intent
+            if _PRIORITY[best] == 0:
+                break
+    return best
+
+
+def strip_command(text: str, intent: str) -> str:
+    """
+    Removes the phrases of the given command from the text, e.g. to get the
+    prompt out of "make image of a cat".
+    """
+    return _PATTERNS_BY_INTENT[intent].sub("", text).strip()
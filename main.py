@@ -1,20 +1,30 @@
 import apprise_sender
+import concurrent.futures
+import gallery
 import gpt
 import helpers
+import hotword
+import http_session
+import intents
 import logging
 import os
+import prompt_cache
 import random
+import regex
 import requests
 import settings
-import shutil
 import signal
 import speech_recognition
-import time
+import stt
+import threading
 import pvporcupine
 from pvrecorder import PvRecorder
+from PIL import Image
 from openai import OpenAI
-import webuiapi
-from typing import Optional, List, Any
+from typing import TYPE_CHECKING, Optional, List, Any
+
+if TYPE_CHECKING:
+    import webuiapi
 
 
 class GPTBuddyError(Exception):
@@ -48,6 +58,64 @@ PHRASE_TIME_LIMIT_SECONDS = 10
 ASSISTANT_TIMEOUT_SECONDS = 10
 DISPLAY_WIDTH = 800
 DISPLAY_HEIGHT = 480
+# Fast zlib level for the saved renders, encoding dominates the save time.
+# Renders are only saved here, the server is asked not to keep its own copy.
+STABLE_DIFFUSION_COMPRESS_LEVEL = 1
+# Sampler, steps and CFG scale per style. LCM checkpoints are tuned for a
+# few steps at a low CFG scale, more steps only cost GPU time.
+STABLE_DIFFUSION_SAMPLER_OPTIONS = {
+    "lcmxl": {"sampler_name": "LCM", "steps": 4, "cfg_scale": 1.5},
+    "anime": {"sampler_name": "Euler a", "steps": 8, "cfg_scale": 2},
+}
+# How far img2img may move away from a cached render of a similar prompt
+STABLE_DIFFUSION_DENOISING_STRENGTH = 0.5
+IMAGE_GENERATION_SHUTDOWN_TIMEOUT_SECONDS = 10
+BACKGROUND_JOBS_SHUTDOWN_TIMEOUT_SECONDS = 10
+# (connect, read) timeouts, so a slow server can't stall startup for long
+HEALTH_CHECK_TIMEOUT_SECONDS = (1, 3)
+AMBIENT_NOISE_DURATION_SECONDS = 0.3
+# Speech recognition tuning. The library defaults wait 0.8s of silence before
+# ending a phrase; a shorter pause and 512-sample chunks (32ms at 16kHz) make
+# the end of an utterance register sooner.
+MICROPHONE_SAMPLE_RATE = 16000
+MICROPHONE_CHUNK_SIZE = 512
+SPEECH_PAUSE_THRESHOLD_SECONDS = 0.5
+SPEECH_NON_SPEAKING_DURATION_SECONDS = 0.3
+
+# Audio cues
+HOTWORD_RESPONSE_AUDIO = ("audio/what.mp3", "audio/yes_question.mp3")
+END_CONVERSATION_AUDIO = ("audio/oh_ok.mp3", "audio/alright_then.mp3")
+OK_AUDIO = "audio/oh_ok.mp3"
+SENDING_IMAGE_AUDIO = "audio/sending_image.mp3"
+THINKING_AUDIO = "audio/hmm.mp3"
+
+# Assistant screens
+LISTENING_IMAGE = "assistant_images/listening.png"
+THINKING_IMAGE = "assistant_images/thinking.png"
+
+# Characters str.isprintable() rejects (control, format, unassigned and
+# separator code points, null bytes included), apart from plain spaces,
+# newlines and tabs
+_UNPRINTABLE_RE = regex.compile(r"[[\p{C}\p{Z}]--[ \n\t]]", regex.V1)
+
+# Picks the spoken cues. Kept apart from the shared module-level generator,
+# which the gallery and libraries also draw from.
+_rng = random.Random()
+
+# Blocking file copies and notifications run on a single background worker,
+# in the order they were requested, so the main loop can go straight back to
+# waiting for the hotword.
+_io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="io")
+
+# Stable Diffusion renders run in the background so the hotword can still be
+# heard meanwhile. The server renders one image at a time anyway, so a single
+# worker just queues requests in order.
+_stable_diffusion_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="stable-diffusion"
+)
+_stable_diffusion_api: Optional["webuiapi.WebUIApi"] = None
+# Earlier renders by prompt, so repeated prompts don't have to be rendered again
+_prompt_cache = prompt_cache.PromptCache()
 
 
 def sanitize_input(text: str) -> str:
@@ -74,30 +142,20 @@ def sanitize_input(text: str) -> str:
         text = text[:max_length]
 
     # Remove control characters except newlines and tabs
-    sanitized = "".join(char for char in text if char.isprintable() or char in "\n\t")
-
-    # Remove any null bytes
-    sanitized = sanitized.replace("\x00", "")
+    return _UNPRINTABLE_RE.sub("", text)
 
-    return sanitized
 
-
-def check_external_services() -> bool:
+def _probe_openai(client: Optional[OpenAI] = None) -> None:
     """
-    Perform health checks on external services.
-
-    Returns:
-        True if all critical services are accessible, False otherwise
+    Check that the OpenAI API is reachable.
 
     Raises:
-        ExternalServiceError: If critical services are not accessible
+        ExternalServiceError: If the API cannot be reached
     """
-    logging.info("Performing health checks on external services...")
-
-    # Check OpenAI API
     try:
         logging.info("Checking OpenAI API connectivity...")
-        client = OpenAI(api_key=settings.openai_api_key)
+        if client is None:
+            client = OpenAI(api_key=settings.openai_api_key)
         # Simple API call to verify connectivity - just get first model
         _ = client.models.list(limit=1)
         logging.info("✓ OpenAI API is accessible")
@@ -105,32 +163,125 @@ def check_external_services() -> bool:
         logging.error(f"✗ OpenAI API check failed: {e}")
         raise ExternalServiceError(f"Cannot connect to OpenAI API: {e}")
 
-    # Check Stable Diffusion API (optional service)
-    if settings.stable_diffusion_api and settings.stable_diffusion_port:
-        try:
-            logging.info("Checking Stable Diffusion API connectivity...")
-            url = f"http://{settings.stable_diffusion_api}:{settings.stable_diffusion_port}"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                logging.info("✓ Stable Diffusion API is accessible")
-            else:
-                logging.warning(f"⚠ Stable Diffusion API returned status {response.status_code}")
-        except Exception as e:
-            logging.warning(f"⚠ Stable Diffusion API check failed: {e}")
-            logging.warning("Stable Diffusion features may not work, but this is optional")
+
+def _probe_stable_diffusion() -> None:
+    """
+    Check that the Stable Diffusion API is reachable. The service is
+    optional, so failures are only logged.
+    """
+    try:
+        logging.info("Checking Stable Diffusion API connectivity...")
+        url = f"http://{settings.stable_diffusion_api}:{settings.stable_diffusion_port}"
+        # A single attempt, not the shared session, whose retries would stretch
+        # the timeout well past the fail-fast budget
+        response = requests.get(url, timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+        if response.status_code == 200:
+            logging.info("✓ Stable Diffusion API is accessible")
+        else:
+            logging.warning(f"⚠ Stable Diffusion API returned status {response.status_code}")
+    except Exception as e:
+        logging.warning(f"⚠ Stable Diffusion API check failed: {e}")
+        logging.warning("Stable Diffusion features may not work, but this is optional")
+
+
+def check_external_services(client: Optional[OpenAI] = None) -> bool:
+    """
+    Perform health checks on external services. The probes are pure network
+    I/O, so they run concurrently and the check takes as long as the slowest
+    one rather than the sum of all of them.
+
+    Args:
+        client: OpenAI client to probe with, so its connection pool is reused
+            by the rest of the session (a new client is created if omitted)
+
+    Returns:
+        True if all critical services are accessible, False otherwise
+
+    Raises:
+        ExternalServiceError: If critical services are not accessible
+    """
+    logging.info("Performing health checks on external services...")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        probes = [executor.submit(_probe_openai, client)]
+
+        # Check Stable Diffusion API (optional service)
+        if settings.stable_diffusion_api and settings.stable_diffusion_port:
+            probes.append(executor.submit(_probe_stable_diffusion))
+
+        for probe in concurrent.futures.as_completed(probes):
+            probe.result()
 
     return True
 
 
+def _get_stable_diffusion_api() -> "webuiapi.WebUIApi":
+    """
+    Returns the shared Stable Diffusion client, creating it on first use so
+    every render reuses its keep-alive connection to the server. webuiapi is
+    only imported then too, so startup doesn't pay for it when Stable
+    Diffusion isn't used.
+    """
+    global _stable_diffusion_api
+    if _stable_diffusion_api is None:
+        import webuiapi
+
+        # Get steps from settings with validation
+        steps = getattr(settings, "stable_diffusion_steps", 8)
+        if not isinstance(steps, int) or steps < 1 or steps > 100:
+            logging.warning(f"Invalid stable_diffusion_steps: {steps}, using default: 8")
+            steps = 8
+
+        _stable_diffusion_api = webuiapi.WebUIApi(
+            host=settings.stable_diffusion_api,
+            port=int(settings.stable_diffusion_port),
+            steps=steps,
+        )
+        # Renders go through the shared pooled session, so later renders reuse
+        # the keep-alive connection opened by the first one. Older webuiapi
+        # releases post through requests directly and have no session to share.
+        if hasattr(_stable_diffusion_api, "session"):
+            _stable_diffusion_api.session = http_session.SESSION
+    return _stable_diffusion_api
+
+
+def _get_sampler_options(styles: List[str]) -> dict:
+    """
+    Returns the sampler, steps and CFG scale for a render in the given
+    styles, with any overrides from settings.py applied.
+    """
+    options = {"cfg_scale": 2}
+    # The first style with its own options decides them
+    style = next((style for style in styles if style in STABLE_DIFFUSION_SAMPLER_OPTIONS), None)
+    if style is None:
+        return options
+    options.update(STABLE_DIFFUSION_SAMPLER_OPTIONS[style])
+
+    samplers = getattr(settings, "stable_diffusion_sampler_by_style", {})
+    if style in samplers:
+        options["sampler_name"] = samplers[style]
+
+    steps = getattr(settings, "stable_diffusion_steps_by_style", {}).get(style)
+    if steps is not None:
+        if isinstance(steps, int) and 1 <= steps <= 100:
+            options["steps"] = steps
+        else:
+            logging.warning(f"Invalid stable_diffusion_steps_by_style for {style}: {steps}")
+    return options
+
+
 def generate_stable_diffusion_image(
-    prompt: str, styles: Optional[List[str]] = None
+    prompt: str, styles: Optional[List[str]] = None, use_cache: bool = True
 ) -> Optional[str]:
     """
-    Generate an image using Stable Diffusion API.
+    Generate an image using Stable Diffusion API. A render of the same prompt
+    is shown again, and one of a similar prompt is used as the starting point
+    for img2img.
 
     Args:
         prompt: Text prompt for image generation
         styles: List of style names to apply (default: ["lcmxl"])
+        use_cache: Whether earlier renders may be reused
 
     Returns:
         Path to the saved image file, or None if generation fails
@@ -144,32 +295,49 @@ def generate_stable_diffusion_image(
         return None
 
     try:
-        # Get steps from settings with validation
-        steps = getattr(settings, "stable_diffusion_steps", 8)
-        if not isinstance(steps, int) or steps < 1 or steps > 100:
-            logging.warning(f"Invalid stable_diffusion_steps: {steps}, using default: 8")
-            steps = 8
-
-        api = webuiapi.WebUIApi(
-            host=settings.stable_diffusion_api,
-            port=int(settings.stable_diffusion_port),
-            steps=steps,
-        )
-
-        filename = time.strftime("%Y%m%d-%H%M%S")
-
-        result = api.txt2img(
-            prompt=prompt,
-            negative_prompt="ugly, out of frame",
-            width=DISPLAY_WIDTH,
-            height=DISPLAY_HEIGHT,
-            styles=styles,
-            save_images=True,
-            cfg_scale=2,
+        if use_cache:
+            reused = _prompt_cache.find(prompt, styles)
+            if reused:
+                logging.info(f"Reusing Stable Diffusion image {reused} for prompt: {prompt}")
+                return reused
+        cached = _prompt_cache.lookup(prompt, styles) if use_cache else None
+
+        api = _get_stable_diffusion_api()
+
+        filename = gallery.new_filename()
+        sampler_options = _get_sampler_options(styles)
+
+        if cached and cached[1] >= prompt_cache.IMG2IMG_SIMILARITY:
+            logging.info(f"Starting from Stable Diffusion image {cached[0]}")
+            with Image.open(cached[0]) as initial_image:
+                result = api.img2img(
+                    images=[initial_image],
+                    prompt=prompt,
+                    negative_prompt="ugly, out of frame",
+                    denoising_strength=STABLE_DIFFUSION_DENOISING_STRENGTH,
+                    width=DISPLAY_WIDTH,
+                    height=DISPLAY_HEIGHT,
+                    styles=styles,
+                    save_images=False,
+                    **sampler_options,
+                )
+        else:
+            result = api.txt2img(
+                prompt=prompt,
+                negative_prompt="ugly, out of frame",
+                width=DISPLAY_WIDTH,
+                height=DISPLAY_HEIGHT,
+                styles=styles,
+                save_images=False,
+                **sampler_options,
+            )
+
+        file_path = gallery.path(filename)
+        result.image.save(
+            file_path, format="PNG", compress_level=STABLE_DIFFUSION_COMPRESS_LEVEL, optimize=False
         )
-
-        file_path = f"saved_images/{filename}.png"
-        result.image.save(file_path)
+        gallery.add(filename)
+        _prompt_cache.add(prompt, styles, file_path)
         logging.info(f"Stable Diffusion image saved to {file_path}")
         return file_path
     except Exception as e:
@@ -177,6 +345,23 @@ def generate_stable_diffusion_image(
         return None
 
 
+def send_and_save_image() -> None:
+    """
+    Adds the current DALL-E image to the saved images folder and sends the
+    full-size original with Apprise. Runs on the background IO worker.
+    """
+    try:
+        # Copy the display image first, before a new image can replace it
+        filename = gallery.new_filename()
+        gallery.save_copy(gpt.DISPLAY_IMAGE_PATH, filename)
+
+        # The full-size original is only written out when it's sent
+        if gpt.save_original_image("dalle_image.png"):
+            apprise_sender.send("", "", "dalle_image.png")
+    except Exception as e:
+        logging.error(f"Error sending image: {e}", exc_info=True)
+
+
 def main():
     """Main application loop for the GPT Buddy voice assistant."""
     logging.info("=" * 60)
@@ -210,37 +395,33 @@ def main():
         print(f"ERROR: {e}")
         return
 
+    logging.info("Initializing OpenAI client...")
+    client = OpenAI(api_key=settings.openai_api_key)
+
     # Perform health checks on external services
     try:
-        check_external_services()
+        check_external_services(client)
     except ExternalServiceError as e:
         logging.error(f"External service error: {e}")
         print(f"ERROR: {e}")
         return
 
-    logging.info("Initializing OpenAI client and assistant...")
-    client = OpenAI(api_key=settings.openai_api_key)
+    logging.info("Initializing OpenAI assistant...")
     assistant = gpt.get_assistant(client)
-    assistant_thread = client.beta.threads.create()
-    logging.info(f"Assistant thread created: {assistant_thread.id}")
+    assistant_thread = gpt.get_assistant_thread(client)
 
     # Check if saved_images directory has any images
-    images = os.listdir("saved_images")
-    if images:
-        random_image = random.choice(images)
-        helpers.display_image(f"saved_images/{random_image}")
-        current_image = random_image
+    gallery.load()
+    # Pick up images copied in or deleted while running
+    gallery_observer = gallery.watch()
+    current_image = gallery.pick_random()
+    if current_image:
+        helpers.display_image(gallery.path(current_image))
     else:
         logging.warning("No saved images found. Using default assistant image.")
-        current_image = None
         # Display a default image if available
-        if os.path.exists("assistant_images/listening.png"):
-            helpers.display_image("assistant_images/listening.png")
-
-    # Save the assistant thread to a text file, so we can use it in our
-    # scheduled image cronjob
-    with open("assistant_thread.txt", "w") as assistant_thread_file:
-        assistant_thread_file.write(assistant_thread.id)
+        if os.path.exists(LISTENING_IMAGE):
+            helpers.display_image(LISTENING_IMAGE)
 
     # test_input = "An interesting fact"
     # send_to_assistant(client, assistant, assistant_thread, test_input)
@@ -249,204 +430,211 @@ def main():
     for i, device in enumerate(PvRecorder.get_available_devices()):
         logging.info("Device %d: %s" % (i, device))
 
+    # Speech recognition is set up once and reused for every turn. The energy
+    # threshold is calibrated once here and then kept fixed, so it doesn't
+    # drift (and cut phrases short) between turns.
+    microphone = speech_recognition.Microphone(
+        sample_rate=MICROPHONE_SAMPLE_RATE, chunk_size=MICROPHONE_CHUNK_SIZE
+    )
+    speech_result = speech_recognition.Recognizer()
+    speech_result.pause_threshold = SPEECH_PAUSE_THRESHOLD_SECONDS
+    speech_result.non_speaking_duration = SPEECH_NON_SPEAKING_DURATION_SECONDS
+    speech_result.dynamic_energy_threshold = False
+    with microphone as source:
+        speech_result.adjust_for_ambient_noise(source, duration=AMBIENT_NOISE_DURATION_SECONDS)
+    stt.load()
+
+    # Decode the audio cues once instead of on every turn
+    helpers.preload_audio(
+        HOTWORD_RESPONSE_AUDIO
+        + END_CONVERSATION_AUDIO
+        + (OK_AUDIO, SENDING_IMAGE_AUDIO, THINKING_AUDIO)
+    )
+    # Likewise the screens shown on every turn
+    helpers.preload_images((LISTENING_IMAGE, THINKING_IMAGE))
+
     running = True
     wait_for_hotword = True
-    first_session_listen = True
     current_prompt = None
+    image_future = None
+    background_jobs: List[concurrent.futures.Future] = []
+
+    def track_background_job(future: concurrent.futures.Future) -> None:
+        """Keeps a background job to wait for on shutdown"""
+        nonlocal background_jobs
+        background_jobs = [job for job in background_jobs if not job.done()]
+        background_jobs.append(future)
+
+    # Renders are shown from the Stable Diffusion worker, so the image on
+    # screen is only changed with this lock held, and not at all once
+    # shutdown has started
+    current_image_lock = threading.Lock()
+    shutting_down = False
+
+    def show_stable_diffusion_image(future: concurrent.futures.Future) -> None:
+        """Displays a finished Stable Diffusion render"""
+        nonlocal current_image
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logging.error(f"Failed to generate Stable Diffusion image: {future.exception()}")
+            return
+        file_path = future.result()
+        if not file_path:
+            logging.error("Failed to generate Stable Diffusion image")
+            return
+        with current_image_lock:
+            if shutting_down:
+                logging.info(f"Shutting down, not showing Stable Diffusion image {file_path}")
+                return
+            helpers.display_image(file_path)
+            current_image = os.path.basename(file_path)
+
+    def start_stable_diffusion_image(
+        prompt: str, styles: List[str], use_cache: bool = True
+    ) -> None:
+        """Starts a Stable Diffusion render, which is displayed once it's done"""
+        helpers.display_image(THINKING_IMAGE)
+        future = _stable_diffusion_executor.submit(
+            generate_stable_diffusion_image, prompt, styles, use_cache
+        )
+        future.add_done_callback(show_stable_diffusion_image)
+        track_background_job(future)
 
     # Resources that need cleanup
     handle = None
     hotword_recorder = None
+    hotword_listener = None
 
     try:
+        # Hotword setup. Porcupine and its recorder live for the whole
+        # session; the recorder is only stopped while listening for speech.
+        logging.info(pvporcupine.KEYWORDS)
+        pvporcupine_api_key = settings.pvporcupine_api_key
+        handle = pvporcupine.create(access_key=pvporcupine_api_key, keywords=["porcupine"])
+
+        hotword_recorder = PvRecorder(
+            frame_length=handle.frame_length, device_index=MICROPHONE_DEVICE_INDEX
+        )
+        hotword_listener = hotword.HotwordListener(
+            hotword.HotwordDetector(handle, hotword_recorder), hotword_recorder
+        )
+        hotword_listener.listen()
+        logging.info("Waiting for hotword...")
+
+        # Set up the Stable Diffusion client while nothing else is happening,
+        # so the first render doesn't have to
+        if settings.stable_diffusion_api and settings.stable_diffusion_port:
+            _stable_diffusion_executor.submit(_get_stable_diffusion_api)
+
         while running:
             if wait_for_hotword:
-                if first_session_listen:
-                    # Hotword setup
-                    logging.info(pvporcupine.KEYWORDS)
-                    pvporcupine_api_key = settings.pvporcupine_api_key
-                    handle = pvporcupine.create(
-                        access_key=pvporcupine_api_key, keywords=["porcupine"]
-                    )
-
-                    hotword_recorder = PvRecorder(
-                        frame_length=handle.frame_length, device_index=MICROPHONE_DEVICE_INDEX
+                # Block until the listener hears the hotword, it releases the
+                # microphone for speech recognition before returning
+                hotword_listener.wait()
+                logging.info("Detected!")
+                wait_for_hotword = False
+            else:
+                # Hotword detected, continue with speech recognition
+                helpers.play_audio(_rng.choice(HOTWORD_RESPONSE_AUDIO))
+                helpers.display_image(LISTENING_IMAGE)
+                logging.info("Ready for input:")
+                with microphone as source:
+                    audio = speech_result.listen(
+                        source, phrase_time_limit=PHRASE_TIME_LIMIT_SECONDS
                     )
-                    hotword_recorder.start()
-
-                    logging.info("Waiting for hotword...")
-                    first_session_listen = False
-
-                # Wait for the hotword
-                pcm = hotword_recorder.read()
-                result = handle.process(pcm)
-                if result >= 0:
-                    # Hotword detected
-                    logging.info("Detected!")
-                    wait_for_hotword = False
-                    hotword_recorder.delete()
-                    handle.delete()
-                    hotword_recorder = None
-                    handle = None
-        else:
-            # Hotword detected, continue with speech recognition
-            hotword_responses = [
-                "audio/what.mp3",
-                "audio/yes_question.mp3",
-            ]
-            helpers.play_audio(random.choice(hotword_responses))
-            helpers.display_image("assistant_images/listening.png")
-            microphone = speech_recognition.Microphone()
-            speech_result = speech_recognition.Recognizer()
-
-            logging.info("Ready for input:")
-            with microphone as source:
-                audio = speech_result.listen(source, phrase_time_limit=PHRASE_TIME_LIMIT_SECONDS)
-            try:
-                recognised_speech = speech_result.recognize_google(audio)
-                # Sanitize the recognized speech input
-                recognised_speech = sanitize_input(recognised_speech)
-                logging.info(f"Recognised speech: {recognised_speech}")
-                wait_for_hotword = True
-                first_session_listen = True
-
-                # List of phrases to cancel the conversation before making
-                # requests to ChatGPT
-                cancel_phrases = [
-                    "nevermind",
-                    "thanks",
-                    "never mind",
-                    "stop",
-                    "cancel that",
-                    "cancel",
-                    "nothing",
-                    "forget it",
-                ]
-
-                # List of phrases to send the dall-e image to telegram
-                send_image_phrases = [
-                    "send",
-                    "telegram",
-                ]
-
-                # List of phrases to display a random image from the saved
-                # images folder.
-                show_random_image_phrases = [
-                    "random",
-                ]
-                # List of phrases to display a random image from the saved
-                # images folder.
-                show_ai_image_phrases = [
-                    "make image",
-                ]
-                make_another_phrases = ["make another", "make more"]
-
-                if any(cancel_phrase in recognised_speech for cancel_phrase in cancel_phrases):
-                    # Cancel the conversation
-                    end_conversation_phrases = [
-                        "audio/oh_ok.mp3",
-                        "audio/alright_then.mp3",
-                    ]
-                    helpers.play_audio(random.choice(end_conversation_phrases))
-                    helpers.display_image("resized.png")
-
-                elif any(
-                    send_image_phrase in recognised_speech
-                    for send_image_phrase in send_image_phrases
-                ):
+                try:
+                    recognised_speech = stt.transcribe(speech_result, audio)
+                    # Sanitize the recognized speech input
+                    recognised_speech = sanitize_input(recognised_speech)
+                    logging.info(f"Recognised speech: {recognised_speech}")
+                    wait_for_hotword = True
 
-                    # Send the last created dall-e image to Telegram
-                    helpers.display_image("resized.png")
-                    helpers.play_audio("audio/sending_image.mp3")
-                    apprise_sender.send("", "", "dalle_image.png")
-
-                    # Save the image to the saved images folder
-                    filename = time.strftime("%Y%m%d-%H%M%S")
-                    shutil.copyfile("resized.png", f"saved_images/{filename}.png")
-
-                elif any(
-                    make_another_phrase in recognised_speech
-                    for make_another_phrase in make_another_phrases
-                ):
-                    end_conversation_phrases = [
-                        "audio/oh_ok.mp3",
-                        "audio/alright_then.mp3",
-                    ]
-                    helpers.play_audio(random.choice(end_conversation_phrases))
-
-                    logging.info(f"Generating another image with prompt: {current_prompt}")
-
-                    file_path = generate_stable_diffusion_image(current_prompt, styles=["anime"])
-                    if file_path:
-                        helpers.display_image(file_path)
-                        current_image = file_path
-                    else:
-                        logging.error("Failed to generate Stable Diffusion image")
-
-                elif any(
-                    show_random_image_phrase in recognised_speech
-                    for show_random_image_phrase in show_random_image_phrases
-                ):
-                    # Pick a random saved image and display it on the screen
-                    images = os.listdir("saved_images")
-                    if not images:
-                        logging.warning("No saved images available")
-                        helpers.play_audio("audio/oh_ok.mp3")
-                    else:
-                        # Remove current image from selection if it exists
-                        if current_image and current_image in images:
-                            images.remove(current_image)
-
-                        # Check if there are still images to choose from
-                        if images:
-                            random_image = random.choice(images)
-                            helpers.display_image(f"saved_images/{random_image}")
-                            current_image = random_image
+                    intent = intents.classify(recognised_speech)
+
+                    if intent is None:
+                        # Anything that isn't a local command goes to the
+                        # assistant, which is the most common case
+                        helpers.display_image(THINKING_IMAGE)
+                        helpers.play_audio(THINKING_AUDIO)
+                        image_future = gpt.send_to_assistant(
+                            client, assistant, assistant_thread.id, recognised_speech
+                        )
+                        wait_for_hotword = True
+
+                    elif intent == intents.CANCEL:
+                        # Cancel the conversation
+                        helpers.play_audio(_rng.choice(END_CONVERSATION_AUDIO))
+                        helpers.display_image("resized.png")
+
+                    elif intent == intents.SEND_IMAGE:
+                        # Send the last created dall-e image to Telegram and
+                        # save it, in the background while the cue plays
+                        helpers.display_image("resized.png")
+                        track_background_job(_io_executor.submit(send_and_save_image))
+                        helpers.play_audio(SENDING_IMAGE_AUDIO)
+
+                    elif intent == intents.MAKE_ANOTHER:
+                        if not current_prompt:
+                            # Nothing to make another of, don't waste a render
+                            # on an empty prompt
+                            logging.info("No image prompt yet, ignoring make another")
+                            helpers.play_audio(OK_AUDIO)
                         else:
-                            logging.info("Only one image available, showing current")
-                            helpers.play_audio("audio/oh_ok.mp3")
-                elif any(
-                    show_ai_image_phrase in recognised_speech
-                    for show_ai_image_phrase in show_ai_image_phrases
-                ):
-                    # Generate image with Stable Diffusion based on user prompt
-                    end_conversation_phrases = [
-                        "audio/oh_ok.mp3",
-                        "audio/alright_then.mp3",
-                    ]
-                    helpers.play_audio(random.choice(end_conversation_phrases))
-
-                    current_prompt = recognised_speech.replace("make image", "").strip()
-                    logging.info(f"Generating image with prompt: {current_prompt}")
-
-                    file_path = generate_stable_diffusion_image(current_prompt, styles=["lcmxl"])
-                    if file_path:
-                        helpers.display_image(file_path)
-                        current_image = file_path
-                    else:
-                        logging.error("Failed to generate Stable Diffusion image")
-
-                else:
-                    print(recognised_speech)
-
-                    helpers.display_image("assistant_images/thinking.png")
-                    helpers.play_audio("audio/hmm.mp3")
-                    gpt.send_to_assistant(client, assistant, assistant_thread.id, recognised_speech)
+                            logging.info(f"Generating another image with prompt: {current_prompt}")
+
+                            # Asked for a new image, so don't show the last one
+                            # again. The render starts before the cue so the two
+                            # overlap.
+                            start_stable_diffusion_image(
+                                current_prompt, styles=["anime"], use_cache=False
+                            )
+                            helpers.play_audio(_rng.choice(END_CONVERSATION_AUDIO))
+
+                    elif intent == intents.SHOW_RANDOM_IMAGE:
+                        # Pick a random saved image and display it on the screen
+                        if not gallery.SAVED_IMAGES:
+                            logging.warning("No saved images available")
+                            helpers.play_audio(OK_AUDIO)
+                        else:
+                            # Pick an image other than the one already shown
+                            with current_image_lock:
+                                random_image = gallery.pick_random(exclude=current_image)
+                                if random_image:
+                                    helpers.display_image(gallery.path(random_image))
+                                    current_image = random_image
+                            if not random_image:
+                                logging.info("Only one image available, showing current")
+                                helpers.play_audio(OK_AUDIO)
+
+                    elif intent == intents.MAKE_IMAGE:
+                        # Generate image with Stable Diffusion based on user prompt
+                        current_prompt = intents.strip_command(
+                            recognised_speech, intents.MAKE_IMAGE
+                        )
+                        logging.info(f"Generating image with prompt: {current_prompt}")
+
+                        start_stable_diffusion_image(current_prompt, styles=["lcmxl"])
+                        helpers.play_audio(_rng.choice(END_CONVERSATION_AUDIO))
+
+                except speech_recognition.UnknownValueError:
+                    logging.info("Could not understand audio")
+                    helpers.display_image("resized.png")
                     wait_for_hotword = True
+                except speech_recognition.RequestError as e:
+                    logging.info(f"Error: {e}")
 
-            except speech_recognition.UnknownValueError:
-                logging.info("Could not understand audio")
-                helpers.display_image("resized.png")
-                wait_for_hotword = True
-                first_session_listen = True
-            except speech_recognition.RequestError as e:
-                logging.info(f"Error: {e}")
-            except KeyboardInterrupt:
-                logging.info("Shutting down gracefully...")
-                running = False
+                if wait_for_hotword:
+                    # The turn is over, go back to listening for the hotword
+                    hotword_listener.listen()
+                    logging.info("Waiting for hotword...")
+    except KeyboardInterrupt:
+        logging.info("Shutting down gracefully...")
     finally:
         # Cleanup resources
         logging.info("Cleaning up resources...")
+        if hotword_listener is not None:
+            hotword_listener.stop()
         if hotword_recorder is not None:
             try:
                 hotword_recorder.delete()
@@ -458,15 +646,43 @@ def main():
             except Exception as e:
                 logging.error(f"Error cleaning up porcupine handle: {e}")
 
-        # Wait for image generation thread to complete if running
-        if gpt.image_thread is not None and gpt.image_thread.is_alive():
+        # Wait for image generation to complete if running
+        if image_future is not None and not image_future.done():
             logging.info("Waiting for image generation to complete...")
-            gpt.image_thread.join(timeout=10)
-            if gpt.image_thread.is_alive():
+            try:
+                image_future.result(timeout=IMAGE_GENERATION_SHUTDOWN_TIMEOUT_SECONDS)
+            except concurrent.futures.TimeoutError:
                 logging.warning(
-                    "Image generation thread did not complete in time, continuing with shutdown"
+                    "Image generation did not complete in time, continuing with shutdown"
                 )
 
+        # Let queued sends, saves and renders finish
+        if background_jobs:
+            logging.info("Waiting for background jobs to complete...")
+            _, not_done = concurrent.futures.wait(
+                background_jobs, timeout=BACKGROUND_JOBS_SHUTDOWN_TIMEOUT_SECONDS
+            )
+            if not_done:
+                logging.warning(
+                    "Background jobs did not complete in time, continuing with shutdown"
+                )
+
+        # Renders still running after this point aren't shown
+        with current_image_lock:
+            shutting_down = True
+
+        # Drop anything still queued, otherwise the interpreter would wait for
+        # every pending render and upload before exiting
+        for executor in (_io_executor, _stable_diffusion_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if gallery_observer is not None:
+            gallery_observer.stop()
+
+        # Stop the DALL-E and speech workers, so an image finishing late
+        # isn't displayed after cleanup
+        gpt.shutdown()
+
         # Cleanup display process
         helpers.cleanup_display()
 
@@ -0,0 +1,132 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Constants
+PROMPT_CACHE_PATH = "prompt_cache.json"
+# At or above this similarity the earlier render is used as the starting
+# point for img2img rather than rendering from scratch. Only an identical
+# prompt reuses the earlier render as it is.
+IMG2IMG_SIMILARITY = 0.8
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _words(prompt: str) -> List[str]:
+    return _WORD_RE.findall(prompt.lower())
+
+
+def _normalise(prompt: str) -> str:
+    """
+    Returns the prompt without case, punctuation or extra whitespace, so
+    e.g. "A cat, on a sofa" and "a cat on a sofa" count as the same prompt.
+    """
+    return " ".join(_words(prompt))
+
+
+def _vectorise(prompt: str) -> Dict[str, float]:
+    """
+    Returns the prompt as an L2-normalised bag of words and word pairs. The
+    pairs make word order count, so "dog chasing cat" isn't taken for "cat
+    chasing dog".
+    """
+    words = _words(prompt)
+    counts = Counter(words)
+    counts.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    norm = math.sqrt(sum(count * count for count in counts.values()))
+    if not norm:
+        return {}
+    return {term: count / norm for term, count in counts.items()}
+
+
+def _similarity(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """
+    Returns the cosine similarity of two normalised vectors.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+class PromptCache:
+    """
+    Remembers which saved image each Stable Diffusion prompt rendered, so a
+    repeated prompt can reuse its earlier render and a closely paraphrased
+    one can start from it instead of denoising from scratch.
+    """
+
+    def __init__(self, path: str = PROMPT_CACHE_PATH) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        # The prompts as stored on disk, and their vectors for lookups
+        self._records: List[dict] = []
+        self._entries: List[Tuple[Dict[str, float], Tuple[str, ...], str]] = []
+        # The latest render of each normalised prompt and its styles
+        self._renders: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path) as cache_file:
+                records = json.load(cache_file)
+            for record in records:
+                self._index(record["prompt"], record["styles"], record["file_path"])
+            self._records = records
+            logging.info(f"Loaded {len(self._entries)} cached Stable Diffusion prompts")
+        except Exception as e:
+            logging.warning(f"Unable to load prompt cache, starting empty: {e}")
+            self._entries = []
+            self._renders = {}
+
+    def _index(self, prompt: str, styles: Sequence[str], file_path: str) -> None:
+        styles = tuple(styles)
+        self._entries.append((_vectorise(prompt), styles, file_path))
+        self._renders[(_normalise(prompt), styles)] = file_path
+
+    def find(self, prompt: str, styles: Sequence[str]) -> Optional[str]:
+        """
+        Returns the saved image of an identical earlier prompt rendered with
+        the same styles, or None if there's none.
+        """
+        with self._lock:
+            file_path = self._renders.get((_normalise(prompt), tuple(styles)))
+        if file_path is None or not os.path.exists(file_path):
+            return None
+        return file_path
+
+    def lookup(self, prompt: str, styles: Sequence[str]) -> Optional[Tuple[str, float]]:
+        """
+        Returns the saved image of the most similar earlier prompt rendered
+        with the same styles, and its similarity, or None if there's none.
+        """
+        vector = _vectorise(prompt)
+        styles = tuple(styles)
+        best = None
+        with self._lock:
+            for cached_vector, cached_styles, file_path in self._entries:
+                if cached_styles != styles or not os.path.exists(file_path):
+                    continue
+                similarity = _similarity(vector, cached_vector)
+                if best is None or similarity > best[1]:
+                    best = (file_path, similarity)
+        return best
+
+    def add(self, prompt: str, styles: Sequence[str], file_path: str) -> None:
+        """
+        Records a render and writes the cache to disk.
+        """
+        with self._lock:
+            self._index(prompt, styles, file_path)
+            self._records.append({"prompt": prompt, "styles": list(styles), "file_path": file_path})
+            try:
+                with open(self._path, "w") as cache_file:
+                    json.dump(self._records, cache_file)
+            except Exception as e:
+                logging.warning(f"Unable to save prompt cache: {e}")
@@ -0,0 +1,147 @@
+import json
+import logging
+import numpy
+import settings
+import speech_recognition
+
+try:
+    import vosk
+except ImportError:
+    # Vosk is optional, speech is sent to Google when it's missing
+    vosk = None
+
+try:
+    import faster_whisper
+except ImportError:
+    # faster-whisper is optional too
+    faster_whisper = None
+
+# Constants
+ENGINE_GOOGLE = "google"
+ENGINE_VOSK = "vosk"
+ENGINE_WHISPER = "whisper"
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+VOSK_CHUNK_BYTES = 8000
+# Smallest English Whisper model, quantised to int8 so it runs in real time
+# on a Pi-class CPU
+WHISPER_DEFAULT_MODEL = "tiny.en"
+WHISPER_COMPUTE_TYPE = "int8"
+
+# The local models take a few seconds to load, so they're loaded once and kept
+_vosk_model = None
+_whisper_model = None
+# The engine in use, resolved from the settings once rather than on every
+# turn, so a missing package is only warned about once
+_engine = None
+
+
+def get_engine() -> str:
+    """
+    Returns the configured speech recognition engine, falling back to Google
+    if the local engine isn't installed.
+    """
+    global _engine
+    if _engine is None:
+        _engine = _resolve_engine()
+    return _engine
+
+
+def _resolve_engine() -> str:
+    engine = getattr(settings, "speech_recognition_engine", ENGINE_GOOGLE)
+    if engine == ENGINE_GOOGLE:
+        return engine
+    # The package each local engine needs
+    packages = {ENGINE_VOSK: vosk, ENGINE_WHISPER: faster_whisper}
+    if engine not in packages:
+        logging.warning(f"Unknown speech recognition engine: {engine}, using Google")
+        return ENGINE_GOOGLE
+    if packages[engine] is None:
+        logging.warning(f"{engine} is not installed, using Google speech recognition")
+        return ENGINE_GOOGLE
+    return engine
+
+
+def _get_vosk_model() -> "vosk.Model":
+    global _vosk_model
+    if _vosk_model is None:
+        model_path = getattr(settings, "vosk_model_path", "")
+        logging.info(f"Loading Vosk model: {model_path or 'small English model'}")
+        if model_path:
+            _vosk_model = vosk.Model(model_path=model_path)
+        else:
+            _vosk_model = vosk.Model(lang="en-us")
+    return _vosk_model
+
+
+def _get_whisper_model() -> "faster_whisper.WhisperModel":
+    global _whisper_model
+    if _whisper_model is None:
+        model = getattr(settings, "whisper_model", "") or WHISPER_DEFAULT_MODEL
+        logging.info(f"Loading Whisper model: {model}")
+        _whisper_model = faster_whisper.WhisperModel(
+            model, device="cpu", compute_type=WHISPER_COMPUTE_TYPE
+        )
+    return _whisper_model
+
+
+def load() -> None:
+    """
+    Resolves the speech recognition engine and loads its local model, if one
+    is configured, so the first turn doesn't have to wait for it.
+    """
+    global _engine
+    _engine = _resolve_engine()
+    engine = _engine
+    if engine == ENGINE_VOSK:
+        _get_vosk_model()
+    elif engine == ENGINE_WHISPER:
+        _get_whisper_model()
+
+
+def transcribe(
+    recognizer: speech_recognition.Recognizer, audio: speech_recognition.AudioData
+) -> str:
+    """
+    Converts recorded speech to text with the configured engine.
+
+    Raises:
+        speech_recognition.UnknownValueError: If no speech was recognised
+        speech_recognition.RequestError: If the online service can't be reached
+    """
+    engine = get_engine()
+    if engine == ENGINE_VOSK:
+        return _transcribe_with_vosk(audio)
+    if engine == ENGINE_WHISPER:
+        return _transcribe_with_whisper(audio)
+    return recognizer.recognize_google(audio)
+
+
+def _transcribe_with_vosk(audio: speech_recognition.AudioData) -> str:
+    """
+    Recognises speech locally with Vosk, with no network round trip.
+    """
+    recognizer = vosk.KaldiRecognizer(_get_vosk_model(), SAMPLE_RATE)
+    data = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+    for offset in range(0, len(data), VOSK_CHUNK_BYTES):
+        recognizer.AcceptWaveform(data[offset : offset + VOSK_CHUNK_BYTES])
+
+    text = json.loads(recognizer.FinalResult()).get("text", "")
+    if not text:
+        raise speech_recognition.UnknownValueError()
+    return text
+
+
+def _transcribe_with_whisper(audio: speech_recognition.AudioData) -> str:
+    """
+    Recognises speech locally with faster-whisper. The samples are passed as
+    a float array, so nothing is written to a WAV file or decoded by ffmpeg.
+    """
+    data = audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=SAMPLE_WIDTH)
+    samples = numpy.frombuffer(data, dtype=numpy.int16).astype(numpy.float32) / 32768.0
+    segments, _ = _get_whisper_model().transcribe(samples, beam_size=1, vad_filter=True)
+
+    text = " ".join(segment.text.strip() for segment in segments).strip()
+    if not text:
+        raise speech_recognition.UnknownValueError()
+    return text
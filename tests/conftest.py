@@ -2,12 +2,35 @@
 import pytest
 import os
 import sys
+import vlc
 from unittest.mock import Mock, MagicMock
 
 # Add the parent directory to the path so we can import the modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
+def _assistant_text_delta(text):
+    """Streamed assistant event carrying a piece of the reply"""
+    content = Mock(type="text")
+    content.text.value = text
+    event = Mock(event="thread.message.delta")
+    event.data.delta.content = [content]
+    return event
+
+
+@pytest.fixture(autouse=True)
+def mock_sleep(mocker):
+    """Make time.sleep return immediately, so no test waits in real time"""
+    # Tests that check whether the code sleeps request this fixture by name
+    return mocker.patch("time.sleep")
+
+
+@pytest.fixture
+def assistant_text_delta():
+    """Builds streamed assistant events carrying a piece of the reply"""
+    return _assistant_text_delta
+
+
 @pytest.fixture
 def mock_openai_client():
     """Mock OpenAI client for testing"""
@@ -27,26 +50,17 @@ def mock_openai_client():
     mock_message = Mock()
     client.beta.threads.messages.create.return_value = mock_message
 
-    # Mock run
-    mock_run = Mock()
-    mock_run.id = "run_test123"
-    mock_run.status = "completed"
-    client.beta.threads.runs.create.return_value = mock_run
-    client.beta.threads.runs.retrieve.return_value = mock_run
-
-    # Mock thread messages
-    mock_content = Mock()
-    mock_content.text.value = "Test response from assistant"
-    mock_thread_message = Mock()
-    mock_thread_message.content = [mock_content]
-    mock_messages = Mock()
-    mock_messages.data = [mock_thread_message]
-    client.beta.threads.messages.list.return_value = mock_messages
-
-    # Mock TTS
-    mock_speech_response = Mock()
-    mock_speech_response.stream_to_file = Mock()
-    client.audio.speech.create.return_value = mock_speech_response
+    # Mock streamed run, which replies in one delta and completes
+    client.beta.threads.runs.stream.return_value.__enter__.return_value = [
+        _assistant_text_delta("Test response from assistant"),
+        Mock(event="thread.run.completed"),
+    ]
+
+    # Mock streaming TTS
+    mock_speech_response = MagicMock()
+    mock_speech_response.iter_bytes.return_value = iter([b"audio"])
+    speech = client.audio.speech.with_streaming_response.create
+    speech.return_value.__enter__.return_value = mock_speech_response
 
     # Mock image generation
     mock_image_data = Mock()
@@ -93,27 +107,44 @@ def temp_test_dirs(tmp_path):
 
 @pytest.fixture
 def mock_vlc_player(mocker):
-    """Mock VLC media player"""
-    mock_player = MagicMock()
-    mock_player.play = Mock()
-    mock_player.is_playing = Mock(side_effect=[True, True, False])
+    """Mock VLC media player that finishes playing as soon as it starts"""
+    # Specced so a misspelt or removed VLC method fails instead of returning a new mock
+    mock_player = Mock(spec=vlc.MediaPlayer)
+    mock_player.end_callbacks = []
 
-    mock_vlc = mocker.patch("vlc.MediaPlayer")
-    mock_vlc.return_value = mock_player
+    def attach(event_type, callback):
+        mock_player.end_callbacks.append(callback)
+
+    def play():
+        for callback in mock_player.end_callbacks:
+            callback(Mock())
+        return 0
+
+    mock_player.event_manager.return_value.event_attach = Mock(side_effect=attach)
+    mock_player.play = Mock(side_effect=play)
+
+    mock_instance = Mock(spec=vlc.Instance)
+    mock_instance.media_player_new.return_value = mock_player
+    mocker.patch("helpers._vlc_instance", mock_instance)
+    mocker.patch("helpers._media_cache", {})
 
     return mock_player
 
 
-@pytest.fixture
-def mock_subprocess(mocker):
-    """Mock subprocess calls"""
-    mock_call = mocker.patch("subprocess.call")
-    mock_popen = mocker.patch("subprocess.Popen")
+@pytest.fixture(scope="session")
+def dummy_audio_file(tmp_path_factory):
+    """Path of an audio file for tests that only need it to exist"""
+    path = tmp_path_factory.mktemp("audio") / "test.mp3"
+    path.write_bytes(b"x")
+    return str(path)
 
-    return {
-        "call": mock_call,
-        "popen": mock_popen,
-    }
+
+@pytest.fixture(scope="session")
+def dummy_image_file(tmp_path_factory):
+    """Path of an image file for tests that only need it to exist"""
+    path = tmp_path_factory.mktemp("images") / "test.png"
+    path.write_bytes(b"x")
+    return str(path)
 
 
 @pytest.fixture
@@ -121,6 +152,7 @@ def mock_image_processing(mocker):
     """Mock PIL Image processing"""
     mock_image = MagicMock()
     mock_image.resize = Mock(return_value=mock_image)
+    mock_image.copy = Mock(return_value=mock_image)
     mock_image.save = Mock()
 
     mock_open = mocker.patch("PIL.Image.open")
@@ -8,6 +8,12 @@ from unittest.mock import Mock, patch
 import apprise_sender
 
 
+@pytest.fixture(autouse=True)
+def reset_apprise_instance(monkeypatch):
+    """Start every test without a cached Apprise instance"""
+    monkeypatch.setattr(apprise_sender, "_app", None)
+
+
 class TestSend:
     """Tests for send function"""
 
@@ -109,3 +115,22 @@ class TestSend:
         assert mock_apprise_instance.add.call_count == len(services)
         for service in services:
             mock_apprise_instance.add.assert_any_call(service)
+
+    def test_send_reuses_apprise_instance(self, mocker):
+        """Test that services are only parsed once across notifications"""
+        mock_apprise_instance = Mock()
+        mock_apprise_class = mocker.patch("apprise_sender.apprise.Apprise")
+        mock_apprise_class.return_value = mock_apprise_instance
+
+        mock_settings = mocker.patch("apprise_sender.settings")
+        mock_settings.apprise_services = ["tgram://test/test", "discord://a/b"]
+
+        apprise_sender.send("First", "Message", "image.png")
+        apprise_sender.send("Second", "Message", "image.png")
+
+        # Apprise is built and services added only once
+        mock_apprise_class.assert_called_once()
+        assert mock_apprise_instance.add.call_count == 2
+
+        # Both notifications are sent
+        assert mock_apprise_instance.notify.call_count == 2
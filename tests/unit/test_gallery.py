@@ -0,0 +1,178 @@
+"""
+Unit tests for gallery.py module
+Tests for the in-memory index of saved images
+"""
+
+import os
+import pytest
+from unittest.mock import Mock
+import gallery
+
+
+@pytest.fixture(autouse=True)
+def empty_index(mocker):
+    """Give each test its own empty index"""
+    mocker.patch("gallery.SAVED_IMAGES", [])
+    mocker.patch("gallery._saved_image_names", set())
+
+
+class TestIndex:
+    """Tests for load and add functions"""
+
+    def test_load_lists_directory_once(self, tmp_path):
+        """Test that the index is seeded from the saved images folder"""
+        (tmp_path / "b.png").touch()
+        (tmp_path / "old").mkdir()
+        (tmp_path / "a.png").touch()
+
+        result = gallery.load(str(tmp_path))
+
+        assert result == ["a.png", "b.png"]
+        assert gallery.SAVED_IMAGES == ["a.png", "b.png"]
+
+    def test_add_updates_index(self, tmp_path):
+        """Test that saved images are added without listing the folder again"""
+        gallery.load(str(tmp_path))
+
+        gallery.add("new.png")
+
+        assert gallery.SAVED_IMAGES == ["new.png"]
+
+    def test_add_ignores_overwritten_image(self, tmp_path):
+        """Test that an image saved over an existing one isn't listed twice"""
+        (tmp_path / "a.png").touch()
+        gallery.load(str(tmp_path))
+
+        gallery.add("a.png")
+
+        assert gallery.SAVED_IMAGES == ["a.png"]
+
+    def test_save_copy_hard_links(self, tmp_path, mocker):
+        """Test that a saved copy shares the source's data"""
+        mocker.patch("gallery.SAVED_IMAGES_DIR", str(tmp_path))
+        source = tmp_path / "resized.png"
+        source.write_bytes(b"png")
+
+        gallery.save_copy(str(source), "a.png")
+
+        assert os.path.samefile(source, tmp_path / "a.png")
+        assert gallery.SAVED_IMAGES == ["a.png"]
+
+    def test_save_copy_falls_back_to_copy(self, tmp_path, mocker):
+        """Test that the image is copied where hard links aren't supported"""
+        mocker.patch("gallery.SAVED_IMAGES_DIR", str(tmp_path))
+        mocker.patch("gallery.os.link", side_effect=OSError("cross-device link"))
+        source = tmp_path / "resized.png"
+        source.write_bytes(b"png")
+
+        gallery.save_copy(str(source), "a.png")
+
+        assert (tmp_path / "a.png").read_bytes() == b"png"
+        assert not os.path.samefile(source, tmp_path / "a.png")
+        assert gallery.SAVED_IMAGES == ["a.png"]
+
+
+class TestNewFilename:
+    """Tests for new_filename function"""
+
+    def test_numbers_follow_existing_images(self, tmp_path):
+        """Test that numbering carries on after the highest saved image"""
+        (tmp_path / "img_00000007.png").touch()
+        (tmp_path / "img_00000003.png").touch()
+        (tmp_path / "20240101-120000.png").touch()
+        gallery.load(str(tmp_path))
+
+        assert gallery.new_filename() == "img_00000008.png"
+        assert gallery.new_filename() == "img_00000009.png"
+
+    def test_numbers_start_at_one(self, tmp_path):
+        """Test that an empty folder starts numbering at one"""
+        gallery.load(str(tmp_path))
+
+        assert gallery.new_filename() == "img_00000001.png"
+
+
+class TestPickRandom:
+    """Tests for pick_random function"""
+
+    def test_pick_random_empty(self):
+        """Test that None is returned when there are no saved images"""
+        assert gallery.pick_random() is None
+
+    def test_pick_random_only_excluded(self):
+        """Test that None is returned when the only image is excluded"""
+        gallery.add("a.png")
+
+        assert gallery.pick_random(exclude="a.png") is None
+
+    def test_pick_random_skips_excluded(self, mocker):
+        """Test that the excluded image is never returned"""
+        gallery.add("a.png")
+        gallery.add("b.png")
+        mocker.patch("gallery.random.choice", side_effect=["a.png", "a.png", "b.png"])
+
+        assert gallery.pick_random(exclude="a.png") == "b.png"
+
+    def test_path(self):
+        """Test that filenames are resolved inside the saved images folder"""
+        assert gallery.path("a.png") == "saved_images/a.png"
+
+
+class TestWatch:
+    """Tests for keeping the index in sync with the folder"""
+
+    @pytest.fixture
+    def handler(self, tmp_path):
+        """Event handler for a temporary saved images folder"""
+        return gallery._SavedImagesHandler(str(tmp_path))
+
+    def test_written_image_is_added(self, handler, tmp_path):
+        """Test that an image copied into the folder is indexed once it is closed"""
+        handler.on_closed(Mock(src_path=str(tmp_path / "a.png"), is_directory=False))
+
+        assert gallery.SAVED_IMAGES == ["a.png"]
+
+    def test_image_saved_by_app_is_listed_once(self, handler, tmp_path):
+        """Test that a render the app has already indexed isn't listed again"""
+        gallery.add("a.png")
+
+        handler.on_closed(Mock(src_path=str(tmp_path / "a.png"), is_directory=False))
+
+        assert gallery.SAVED_IMAGES == ["a.png"]
+
+    def test_deleted_image_is_removed(self, handler, tmp_path):
+        """Test that an image deleted from the folder is forgotten"""
+        gallery.add("a.png")
+        gallery.add("b.png")
+
+        handler.on_deleted(Mock(src_path=str(tmp_path / "a.png"), is_directory=False))
+
+        assert gallery.SAVED_IMAGES == ["b.png"]
+        assert gallery.pick_random(exclude="b.png") is None
+
+    def test_moved_image_is_renamed(self, handler, tmp_path):
+        """Test that a renamed image is indexed under its new name"""
+        gallery.add("a.png")
+
+        handler.on_moved(
+            Mock(
+                src_path=str(tmp_path / "a.png"),
+                dest_path=str(tmp_path / "b.png"),
+                is_directory=False,
+            )
+        )
+
+        assert gallery.SAVED_IMAGES == ["b.png"]
+
+    def test_subfolders_are_ignored(self, handler, tmp_path):
+        """Test that files in subfolders aren't indexed"""
+        handler.on_closed(Mock(src_path=str(tmp_path / "old" / "a.png"), is_directory=False))
+        handler.on_closed(Mock(src_path=str(tmp_path / "old"), is_directory=True))
+
+        assert gallery.SAVED_IMAGES == []
+
+    def test_watch_without_watchdog(self, mocker):
+        """Test that nothing is watched when watchdog isn't installed"""
+        mocker.patch("gallery.Observer", None)
+
+        assert gallery.watch() is None
@@ -3,10 +3,10 @@ Unit tests for gpt.py module
 Tests for OpenAI API interactions and image generation
 """
 
+import openai
 import pytest
 from unittest.mock import Mock, MagicMock, patch, mock_open
 import gpt
-import threading
 
 
 class TestGetAssistant:
@@ -33,32 +33,76 @@ class TestGetAssistant:
             mock_logging.info.assert_called()
 
 
+class TestGetAssistantThread:
+    """Tests for get_assistant_thread function"""
+
+    def test_resumes_saved_thread(self, mock_openai_client, mocker, tmp_path):
+        """Test that the thread from the last run is reused"""
+        mocker.patch("gpt.logging")
+        path = tmp_path / "assistant_thread.txt"
+        path.write_text("thread_saved\n")
+        mock_openai_client.beta.threads.retrieve.return_value = Mock(id="thread_saved")
+
+        assistant_thread = gpt.get_assistant_thread(mock_openai_client, str(path))
+
+        assert assistant_thread.id == "thread_saved"
+        mock_openai_client.beta.threads.retrieve.assert_called_once_with("thread_saved")
+        mock_openai_client.beta.threads.create.assert_not_called()
+
+    def test_creates_thread_without_saved_one(self, mock_openai_client, mocker, tmp_path):
+        """Test that a new thread is created and saved on the first run"""
+        mocker.patch("gpt.logging")
+        path = tmp_path / "assistant_thread.txt"
+
+        assistant_thread = gpt.get_assistant_thread(mock_openai_client, str(path))
+
+        assert assistant_thread.id == "thread_test123"
+        assert path.read_text() == "thread_test123"
+        mock_openai_client.beta.threads.retrieve.assert_not_called()
+
+    def test_replaces_deleted_thread(self, mock_openai_client, mocker, tmp_path):
+        """Test that a thread that no longer exists is replaced"""
+        mocker.patch("gpt.logging")
+        path = tmp_path / "assistant_thread.txt"
+        path.write_text("thread_deleted")
+        mock_openai_client.beta.threads.retrieve.side_effect = gpt.NotFoundError(
+            "No thread found", response=Mock(status_code=404), body=None
+        )
+
+        assistant_thread = gpt.get_assistant_thread(mock_openai_client, str(path))
+
+        assert assistant_thread.id == "thread_test123"
+        assert path.read_text() == "thread_test123"
+
+
 class TestWhisperTextToSpeech:
     """Tests for whisper_text_to_speech function"""
 
     def test_whisper_text_to_speech_success(self, mock_openai_client, mocker):
         """Test successful text-to-speech generation"""
-        mock_play_audio = mocker.patch("gpt.helpers.play_audio")
+        mock_play_stream = mocker.patch("gpt.helpers.play_audio_stream")
 
         text = "Hello, this is a test"
         gpt.whisper_text_to_speech(mock_openai_client, text)
 
         # Verify API was called with correct parameters
-        mock_openai_client.audio.speech.create.assert_called_once_with(
-            model="tts-1", voice="nova", input=text
+        speech = mock_openai_client.audio.speech.with_streaming_response.create
+        speech.assert_called_once_with(
+            model="tts-1", voice="nova", input=text, response_format="opus"
         )
 
-        # Verify audio file was played
-        mock_play_audio.assert_called_once()
+        # Verify the audio was played straight from the response stream
+        response = speech.return_value.__enter__.return_value
+        mock_play_stream.assert_called_once_with(response.iter_bytes.return_value)
 
     def test_whisper_text_to_speech_empty_text(self, mock_openai_client, mocker):
         """Test with empty text input"""
-        mock_play_audio = mocker.patch("gpt.helpers.play_audio")
+        mocker.patch("gpt.helpers.play_audio_stream")
 
         gpt.whisper_text_to_speech(mock_openai_client, "")
 
         # Should still call API (OpenAI will handle empty text)
-        mock_openai_client.audio.speech.create.assert_called_once()
+        mock_openai_client.audio.speech.with_streaming_response.create.assert_called_once()
 
 
 class TestGenerateChatGPTImage:
@@ -66,24 +110,27 @@ class TestGenerateChatGPTImage:
 
     def test_generate_image_success(self, mock_openai_client, mocker, mock_image_processing):
         """Test successful image generation and display"""
-        # Mock requests.get
+        # Mock the shared HTTP session
         mock_response = MagicMock()
         mock_response.ok = True
-        mock_response.raw.decode_content = True
-        mock_requests = mocker.patch("gpt.requests.get", return_value=mock_response)
+        mock_response.content = b"png"
+        mock_requests = mocker.patch("gpt.http_session.SESSION.get", return_value=mock_response)
 
         # Mock file operations
         mock_file = mocker.patch("builtins.open", mock_open())
 
-        # Mock shutil.copyfileobj
-        mock_copyfile = mocker.patch("gpt.shutil.copyfileobj")
-
-        # Mock display_image
+        # Mock display_image and the rename over the previous display copy
         mock_display = mocker.patch("gpt.helpers.display_image")
+        mock_replace = mocker.patch("gpt.os.replace")
 
         # Mock logging
         mock_logging = mocker.patch("gpt.logging")
 
+        # Restore the module's last image after the test, and force the
+        # Pillow path even where libvips is installed
+        mocker.patch("gpt._last_image", None)
+        mocker.patch("gpt.pyvips", None)
+
         user_text = "Show me a cat"
         assistant_text = "Here's a cat for you"
 
@@ -99,16 +146,88 @@ class TestGenerateChatGPTImage:
         mock_requests.assert_called_once()
         assert mock_requests.call_args[1]["timeout"] == 30
 
-        # Verify image was resized to 800x480
-        mock_image_processing.resize.assert_called_once_with((800, 480))
+        # Verify the downloaded bytes were decoded from memory
+        assert gpt.Image.open.call_args[0][0].getvalue() == b"png"
+
+        # Verify the image was downscaled to fit 800x480
+        mock_image_processing.thumbnail.assert_called_once_with(
+            (800, 480), gpt.Image.Resampling.BILINEAR
+        )
+        mock_image_processing.save.assert_called_once_with(
+            "resized.tmp.png", optimize=False, compress_level=1
+        )
+        mock_replace.assert_called_once_with("resized.tmp.png", "resized.png")
+
+        # The original PNG is kept in memory instead of being written every turn
+        assert gpt._last_image == b"png"
 
         # Verify image was displayed
         mock_display.assert_called_once_with("resized.png")
 
+    def test_generate_image_after_shutdown(self, mock_openai_client, mocker, mock_image_processing):
+        """Test that an image finishing after shutdown is saved but not displayed"""
+        mock_response = MagicMock()
+        mock_response.ok = True
+        mock_response.content = b"png"
+        mocker.patch("gpt.http_session.SESSION.get", return_value=mock_response)
+        mock_display = mocker.patch("gpt.helpers.display_image")
+        mocker.patch("gpt.os.replace")
+        mocker.patch("gpt.logging")
+        mocker.patch("gpt._last_image", None)
+        mocker.patch("gpt.pyvips", None)
+        mocker.patch("gpt._shut_down", True)
+
+        gpt.generate_chatgpt_image(mock_openai_client, "Show me a cat", "Here's a cat")
+
+        mock_display.assert_not_called()
+
+    def test_generate_image_prefers_vips(self, mock_openai_client, mocker):
+        """Test that libvips is used for the resize when it's available"""
+        mock_response = MagicMock()
+        mock_response.ok = True
+        mock_response.content = b"png"
+        mocker.patch("gpt.http_session.SESSION.get", return_value=mock_response)
+        mocker.patch("gpt.helpers.display_image")
+        mocker.patch("gpt.os.replace")
+        mocker.patch("gpt.logging")
+        mocker.patch("gpt._last_image", None)
+        mock_pil_open = mocker.patch("gpt.Image.open")
+        mock_vips = mocker.patch("gpt.pyvips")
+
+        gpt.generate_chatgpt_image(mock_openai_client, "test", "test")
+
+        mock_vips.Image.thumbnail_buffer.assert_called_once_with(b"png", 800, height=480)
+        mock_vips.Image.thumbnail_buffer.return_value.pngsave.assert_called_once_with(
+            "resized.tmp.png", compression=1
+        )
+        mock_pil_open.assert_not_called()
+        assert gpt._last_image == b"png"
+
+    def test_generate_image_vips_failure_falls_back_to_pillow(
+        self, mock_openai_client, mocker, mock_image_processing
+    ):
+        """Test that a libvips error falls back to the Pillow resize"""
+        mock_response = MagicMock()
+        mock_response.ok = True
+        mock_response.content = b"png"
+        mocker.patch("gpt.http_session.SESSION.get", return_value=mock_response)
+        mock_display = mocker.patch("gpt.helpers.display_image")
+        mocker.patch("gpt.os.replace")
+        mocker.patch("gpt.logging")
+        mocker.patch("gpt._last_image", None)
+        mock_vips = mocker.patch("gpt.pyvips")
+        mock_vips.Image.thumbnail_buffer.side_effect = RuntimeError("unsupported")
+
+        gpt.generate_chatgpt_image(mock_openai_client, "test", "test")
+
+        mock_image_processing.thumbnail.assert_called_once()
+        mock_display.assert_called_once_with("resized.png")
+        assert gpt._last_image == b"png"
+
     def test_generate_image_network_error(self, mock_openai_client, mocker):
         """Test handling of network errors during image download"""
-        # Mock requests.get to raise an exception
-        mocker.patch("gpt.requests.get", side_effect=Exception("Network error"))
+        # Mock the shared HTTP session to raise an exception
+        mocker.patch("gpt.http_session.SESSION.get", side_effect=Exception("Network error"))
 
         mock_logging = mocker.patch("gpt.logging")
 
@@ -125,7 +244,7 @@ class TestGenerateChatGPTImage:
         """Test handling when image download fails"""
         mock_response = MagicMock()
         mock_response.ok = False
-        mocker.patch("gpt.requests.get", return_value=mock_response)
+        mocker.patch("gpt.http_session.SESSION.get", return_value=mock_response)
 
         mock_display = mocker.patch("gpt.helpers.display_image")
         mock_logging = mocker.patch("gpt.logging")
@@ -136,15 +255,59 @@ class TestGenerateChatGPTImage:
         mock_display.assert_not_called()
 
 
+class TestShutdown:
+    """Tests for shutdown function"""
+
+    def test_shutdown_stops_workers(self, mocker):
+        """Test that both workers are shut down without waiting and queued jobs dropped"""
+        mocker.patch("gpt._shut_down", False)
+        mock_image_executor = mocker.patch("gpt._image_executor")
+        mock_speech_executor = mocker.patch("gpt._speech_executor")
+
+        gpt.shutdown()
+
+        assert gpt._shut_down is True
+        for executor in (mock_image_executor, mock_speech_executor):
+            executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+
+class TestSaveOriginalImage:
+    """Tests for save_original_image function"""
+
+    def test_save_original_image_writes_last_image(self, mocker, tmp_path):
+        """Test that the downloaded PNG is written out as-is"""
+        mocker.patch("gpt._last_image", b"png")
+        mocker.patch("gpt.logging")
+        path = tmp_path / "original.png"
+
+        assert gpt.save_original_image(str(path)) is True
+
+        assert path.read_bytes() == b"png"
+
+    def test_save_original_image_without_image(self, mocker):
+        """Test that nothing is written before an image has been generated"""
+        mocker.patch("gpt._last_image", None)
+        mocker.patch("gpt.logging")
+
+        assert gpt.save_original_image() is False
+
+    def test_save_original_image_handles_errors(self, mocker, tmp_path):
+        """Test that a failed save is logged rather than raised"""
+        mocker.patch("gpt._last_image", b"png")
+        mock_logging = mocker.patch("gpt.logging")
+
+        assert gpt.save_original_image(str(tmp_path / "missing" / "original.png")) is False
+        mock_logging.error.assert_called_once()
+
+
 class TestSendToAssistant:
     """Tests for send_to_assistant function"""
 
     def test_send_to_assistant_success(self, mock_openai_client, mocker):
         """Test successful assistant interaction"""
         mock_tts = mocker.patch("gpt.whisper_text_to_speech")
-        mock_thread = mocker.patch("gpt.threading.Thread")
+        mock_executor = mocker.patch("gpt._image_executor")
         mock_logging = mocker.patch("gpt.logging")
-        mocker.patch("gpt.time.sleep")  # Speed up test
 
         input_text = "What's the weather?"
         assistant_id = "asst_test123"
@@ -153,27 +316,35 @@ class TestSendToAssistant:
         mock_assistant = Mock()
         mock_assistant.id = assistant_id
 
-        gpt.send_to_assistant(
+        image_future = gpt.send_to_assistant(
             mock_openai_client, mock_assistant, thread_id, input_text, text_to_speech=True
         )
 
         # Verify message was created
         mock_openai_client.beta.threads.messages.create.assert_called_once()
 
-        # Verify run was created
-        mock_openai_client.beta.threads.runs.create.assert_called_once()
+        # Verify the run was streamed rather than polled
+        mock_openai_client.beta.threads.runs.stream.assert_called_once_with(
+            thread_id=thread_id, assistant_id=assistant_id, timeout=10
+        )
+        mock_openai_client.beta.threads.runs.retrieve.assert_not_called()
 
         # Verify TTS was called
-        mock_tts.assert_called_once()
-
-        # Verify image thread was started
-        mock_thread.return_value.start.assert_called_once()
+        mock_tts.assert_called_once_with(mock_openai_client, "Test response from assistant")
+
+        # Verify image generation was submitted in the background
+        mock_executor.submit.assert_called_once_with(
+            gpt.generate_chatgpt_image,
+            mock_openai_client,
+            input_text,
+            "Test response from assistant",
+        )
+        assert image_future is mock_executor.submit.return_value
 
     def test_send_to_assistant_no_tts(self, mock_openai_client, mocker):
         """Test assistant interaction without text-to-speech"""
         mock_tts = mocker.patch("gpt.whisper_text_to_speech")
-        mocker.patch("gpt.threading.Thread")
-        mocker.patch("gpt.time.sleep")
+        mocker.patch("gpt._image_executor")
         mocker.patch("gpt.logging")
 
         mock_assistant = Mock()
@@ -186,19 +357,15 @@ class TestSendToAssistant:
         # TTS should not be called
         mock_tts.assert_not_called()
 
-    def test_send_to_assistant_timeout(self, mock_openai_client, mocker):
+    def test_send_to_assistant_timeout(self, mock_openai_client, mocker, assistant_text_delta):
         """Test handling of assistant timeout"""
-        # Mock run that never completes
-        mock_run = Mock()
-        mock_run.id = "run_test123"
-        mock_run.status = "in_progress"  # Never completes
-
-        mock_openai_client.beta.threads.runs.create.return_value = mock_run
-        mock_openai_client.beta.threads.runs.retrieve.return_value = mock_run
+        # A run that is still streaming when the timeout is reached
+        stream = mock_openai_client.beta.threads.runs.stream.return_value.__enter__
+        stream.return_value = [assistant_text_delta("Let me")] * 3
+        mocker.patch("gpt.time.monotonic", side_effect=[0, 1, 5, 11])
 
         mock_tts = mocker.patch("gpt.whisper_text_to_speech")
-        mocker.patch("gpt.threading.Thread")
-        mock_sleep = mocker.patch("gpt.time.sleep")
+        mocker.patch("gpt._image_executor")
         mock_logging = mocker.patch("gpt.logging")
 
         mock_assistant = Mock()
@@ -207,18 +374,44 @@ class TestSendToAssistant:
         gpt.send_to_assistant(mock_openai_client, mock_assistant, "thread_test123", "test")
 
         # Should log timeout
-        assert mock_logging.info.call_count > 0
+        mock_logging.warning.assert_called_once()
 
         # Should still call TTS with error message
         mock_tts.assert_called_once()
         tts_arg = mock_tts.call_args[0][1]
         assert "went wrong" in tts_arg.lower()
 
+    def test_send_to_assistant_stream_timeout(
+        self, mock_openai_client, mocker, assistant_text_delta
+    ):
+        """Test that a stalled stream is apologised for and its run cancelled"""
+
+        def stalled_stream():
+            yield Mock(event="thread.run.created", data=Mock(id="run_test123"))
+            yield assistant_text_delta("Let me")
+            raise openai.APITimeoutError(request=Mock())
+
+        stream = mock_openai_client.beta.threads.runs.stream.return_value.__enter__
+        stream.return_value = stalled_stream()
+
+        mock_tts = mocker.patch("gpt.whisper_text_to_speech")
+        mocker.patch("gpt._image_executor")
+        mocker.patch("gpt.logging")
+
+        mock_assistant = Mock()
+        mock_assistant.id = "asst_test123"
+
+        gpt.send_to_assistant(mock_openai_client, mock_assistant, "thread_test123", "test")
+
+        mock_tts.assert_called_once_with(mock_openai_client, gpt.ASSISTANT_ERROR_RESPONSE)
+        mock_openai_client.beta.threads.runs.cancel.assert_called_once_with(
+            run_id="run_test123", thread_id="thread_test123"
+        )
+
     def test_send_to_assistant_brief_prompt_added(self, mock_openai_client, mocker):
         """Test that brief prompt is added to user input"""
         mocker.patch("gpt.whisper_text_to_speech")
-        mocker.patch("gpt.threading.Thread")
-        mocker.patch("gpt.time.sleep")
+        mocker.patch("gpt._image_executor")
         mocker.patch("gpt.logging")
 
         mock_assistant = Mock()
@@ -232,3 +425,68 @@ class TestSendToAssistant:
         call_args = mock_openai_client.beta.threads.messages.create.call_args[1]
         assert "brief" in call_args["content"].lower()
         assert input_text in call_args["content"]
+
+    def test_send_to_assistant_speaks_sentences_as_they_arrive(
+        self, mock_openai_client, mocker, assistant_text_delta
+    ):
+        """Test that complete sentences are spoken before the reply finishes"""
+        first = "The tallest mountain on Earth is Mount Everest."
+        second = "It is 8849 metres high."
+        stream = mock_openai_client.beta.threads.runs.stream.return_value.__enter__
+        stream.return_value = [
+            assistant_text_delta("The tallest mountain on Earth "),
+            assistant_text_delta("is Mount Everest. It is"),
+            assistant_text_delta(" 8849 metres high."),
+            Mock(event="thread.run.completed"),
+        ]
+
+        mock_tts = mocker.patch("gpt.whisper_text_to_speech")
+        mock_executor = mocker.patch("gpt._image_executor")
+        mocker.patch("gpt.logging")
+
+        mock_assistant = Mock()
+        mock_assistant.id = "asst_test123"
+
+        gpt.send_to_assistant(mock_openai_client, mock_assistant, "thread_test123", "test")
+
+        spoken = [c.args[1] for c in mock_tts.call_args_list]
+        assert spoken == [first, second]
+        assert mock_executor.submit.call_args.args[3] == f"{first} {second}"
+
+    def test_send_to_assistant_holds_back_short_sentences(
+        self, mock_openai_client, mocker, assistant_text_delta
+    ):
+        """Test that a short sentence is spoken together with the next one"""
+        stream = mock_openai_client.beta.threads.runs.stream.return_value.__enter__
+        stream.return_value = [
+            assistant_text_delta("Sure! "),
+            assistant_text_delta("Here is a picture of a cat."),
+            Mock(event="thread.run.completed"),
+        ]
+
+        mock_tts = mocker.patch("gpt.whisper_text_to_speech")
+        mocker.patch("gpt._image_executor")
+        mocker.patch("gpt.logging")
+
+        mock_assistant = Mock()
+        mock_assistant.id = "asst_test123"
+
+        gpt.send_to_assistant(mock_openai_client, mock_assistant, "thread_test123", "test")
+
+        mock_tts.assert_called_once_with(mock_openai_client, "Sure! Here is a picture of a cat.")
+
+    def test_send_to_assistant_failed_run(self, mock_openai_client, mocker):
+        """Test that a failed run is reported instead of waiting for the timeout"""
+        stream = mock_openai_client.beta.threads.runs.stream.return_value.__enter__
+        stream.return_value = [Mock(event="thread.run.failed")]
+
+        mock_tts = mocker.patch("gpt.whisper_text_to_speech")
+        mocker.patch("gpt._image_executor")
+        mocker.patch("gpt.logging")
+
+        mock_assistant = Mock()
+        mock_assistant.id = "asst_test123"
+
+        gpt.send_to_assistant(mock_openai_client, mock_assistant, "thread_test123", "test")
+
+        assert "went wrong" in mock_tts.call_args[0][1].lower()
@@ -4,31 +4,71 @@ Tests for audio playback and image display functionality
 """
 
 import pytest
+import ctypes
 import os
+import signal
+import subprocess
+import threading
 from unittest.mock import Mock, patch, call
 import helpers
+from PIL import Image
+
+
+def fbi_command(image_file):
+    """The fbi command line display_image should run for an image"""
+    return ["sudo", "fbi", "-T", "1", str(image_file), "--noverbose"]
+
+
+@pytest.fixture(autouse=True)
+def no_framebuffer(monkeypatch):
+    """Show images with fbi unless a test provides a framebuffer"""
+    monkeypatch.setattr(helpers, "_framebuffer", None)
+    monkeypatch.setattr(helpers, "_framebuffer_checked", True)
+    monkeypatch.setattr(helpers, "_display_closed", False)
+
+
+@pytest.fixture(autouse=True)
+def no_fbi_process(monkeypatch):
+    """Give every test its own fbi display, with no fbi process running"""
+    monkeypatch.setattr(helpers, "_fbi_display", helpers.FbiDisplay())
+
+
+@pytest.fixture
+def framebuffer_files(tmp_path):
+    """Create a fake 4x2 framebuffer device and its sysfs attributes"""
+
+    def create(bits_per_pixel=32, stride=None, modes="U:4x2p-0\n"):
+        sysfs_dir = tmp_path / "sysfs"
+        sysfs_dir.mkdir()
+        (sysfs_dir / "virtual_size").write_text("4,4\n")
+        (sysfs_dir / "bits_per_pixel").write_text(f"{bits_per_pixel}\n")
+        if modes is not None:
+            (sysfs_dir / "modes").write_text(modes)
+        if stride is not None:
+            (sysfs_dir / "stride").write_text(f"{stride}\n")
+
+        device = tmp_path / "fb0"
+        device.write_bytes(b"")
+        return str(device), str(sysfs_dir)
+
+    return create
 
 
 class TestPlayAudio:
     """Tests for play_audio function"""
 
-    def test_play_audio_with_valid_file(self, mock_vlc_player, mocker, tmp_path):
+    def test_play_audio_with_valid_file(self, mock_vlc_player, mock_sleep, dummy_audio_file):
         """Test that a valid audio file plays successfully"""
-        # Create a test audio file
-        audio_file = tmp_path / "test.mp3"
-        audio_file.write_text("test audio content")
-
-        # Mock time.sleep to speed up test
-        mock_sleep = mocker.patch("time.sleep")
-
         # Call the function
-        helpers.play_audio(str(audio_file))
+        helpers.play_audio(dummy_audio_file)
 
         # Verify VLC player was called
         mock_vlc_player.play.assert_called_once()
 
-        # Verify sleep was called (for waiting)
-        assert mock_sleep.call_count >= 1
+        # Verify it returned on the end-of-media event, without polling or
+        # sleeping
+        mock_sleep.assert_not_called()
+        mock_vlc_player.is_playing.assert_not_called()
 
     def test_play_audio_with_missing_file(self, mocker):
         """Test that missing audio file is handled gracefully"""
@@ -36,7 +76,7 @@ class TestPlayAudio:
         mock_logging = mocker.patch("helpers.logging")
 
         # Mock VLC to avoid actual playback attempt
-        mocker.patch("vlc.MediaPlayer")
+        mocker.patch("helpers._vlc_instance")
 
         # Call with non-existent file
         helpers.play_audio("/non/existent/file.mp3")
@@ -44,45 +84,172 @@ class TestPlayAudio:
         # Verify error was logged
         mock_logging.error.assert_called_once()
 
-    def test_play_audio_waits_for_completion(self, mock_vlc_player, mocker, tmp_path):
+    def test_play_audio_waits_for_completion(self, mock_vlc_player, dummy_audio_file):
         """Test that function waits until audio finishes playing"""
-        audio_file = tmp_path / "test.mp3"
-        audio_file.write_text("test")
+        # Playback starts but VLC hasn't reported the end of the clip yet
+        mock_vlc_player.play.side_effect = lambda: 0
 
-        mock_sleep = mocker.patch("time.sleep")
+        playback = threading.Thread(target=helpers.play_audio, args=(dummy_audio_file,))
+        playback.start()
+        playback.join(timeout=0.2)
+        assert playback.is_alive()
 
-        # is_playing returns True twice, then False
-        mock_vlc_player.is_playing.side_effect = [True, True, False]
+        # VLC reports the end of the clip
+        for callback in mock_vlc_player.end_callbacks:
+            callback(Mock())
 
+        playback.join(timeout=1)
+        assert not playback.is_alive()
+
+    def test_play_audio_times_out(self, mock_vlc_player, mocker, dummy_audio_file):
+        """Test that a clip that never reports completion doesn't block forever"""
+        mock_vlc_player.play.side_effect = lambda: 0
+        mocker.patch("helpers.PLAYBACK_TIMEOUT_SECONDS", 0.01)
+        mock_logging = mocker.patch("helpers.logging")
+
+        helpers.play_audio(dummy_audio_file)
+
+        mock_logging.warning.assert_called_once()
+
+    def test_play_audio_reuses_media(self, mock_vlc_player, dummy_audio_file):
+        """Test that repeated cues are only opened by VLC once"""
+        helpers.play_audio(dummy_audio_file)
+        helpers.play_audio(dummy_audio_file)
+
+        helpers._vlc_instance.media_new.assert_called_once_with(dummy_audio_file)
+        assert mock_vlc_player.release.call_count == 2
+
+    def test_play_audio_reloads_changed_file(self, mock_vlc_player, tmp_path):
+        """Test that a rewritten file (e.g. new speech) is opened again"""
+        audio_file = tmp_path / "speech.mp3"
+        audio_file.write_text("first")
+        helpers.play_audio(str(audio_file))
+
+        os.utime(audio_file, (0, 0))
         helpers.play_audio(str(audio_file))
 
-        # Should sleep at least 3 times (initial + 2 while playing)
-        assert mock_sleep.call_count >= 3
+        assert helpers._vlc_instance.media_new.call_count == 2
+
+    def test_play_audio_play_failure(self, mock_vlc_player, mocker, dummy_audio_file):
+        """Test that a player that fails to start is not waited on"""
+        mock_vlc_player.play.side_effect = lambda: -1
+        mock_logging = mocker.patch("helpers.logging")
+
+        helpers.play_audio(dummy_audio_file)
+
+        mock_logging.error.assert_called_once()
+
+
+class TestPreloadAudio:
+    """Tests for preload_audio and playing preloaded cues"""
+
+    @pytest.fixture
+    def audio_libraries(self, mocker):
+        """Mock sounddevice and soundfile, with an empty cue cache"""
+        mocker.patch("helpers._preloaded_audio", {})
+        mock_sounddevice = mocker.patch("helpers.sounddevice")
+        mock_soundfile = mocker.patch("helpers.soundfile")
+        return mock_sounddevice, mock_soundfile
+
+    def test_preloaded_cue_skips_vlc(self, audio_libraries, mock_vlc_player):
+        """Test that a preloaded cue is played from memory"""
+        mock_sounddevice, mock_soundfile = audio_libraries
+        samples = Mock()
+        mock_soundfile.read.return_value = (samples, 24000)
+
+        helpers.preload_audio(["audio/what.mp3"])
+        helpers.play_audio("audio/what.mp3")
+        helpers.play_audio("audio/what.mp3")
+
+        mock_soundfile.read.assert_called_once_with("audio/what.mp3", dtype="int16", always_2d=True)
+        mock_sounddevice.play.assert_called_with(samples, 24000)
+        assert mock_sounddevice.wait.call_count == 2
+        mock_vlc_player.play.assert_not_called()
+
+    def test_undecodable_cue_uses_vlc(
+        self, audio_libraries, mock_vlc_player, mocker, dummy_audio_file
+    ):
+        """Test that a cue that can't be decoded is still played with VLC"""
+        mock_sounddevice, mock_soundfile = audio_libraries
+        mock_soundfile.read.side_effect = RuntimeError("unsupported format")
+        mocker.patch("helpers.logging")
+
+        helpers.preload_audio([dummy_audio_file])
+        helpers.play_audio(dummy_audio_file)
+
+        mock_sounddevice.play.assert_not_called()
+        mock_vlc_player.play.assert_called_once()
+
+    def test_preload_without_libraries(self, mocker):
+        """Test that nothing is preloaded when sounddevice isn't available"""
+        mocker.patch("helpers._preloaded_audio", {})
+        mocker.patch("helpers.sounddevice", None)
+
+        helpers.preload_audio(["audio/what.mp3"])
+
+        assert helpers._preloaded_audio == {}
+
+
+class TestPlayAudioStream:
+    """Tests for play_audio_stream function and AudioStream"""
+
+    def test_play_audio_stream_plays_from_memory(self, mock_vlc_player):
+        """Test that streamed audio is played through read callbacks"""
+        helpers.play_audio_stream(iter([b"abc"]))
+
+        media_new_callbacks = helpers._vlc_instance.media_new_callbacks
+        media_new_callbacks.assert_called_once()
+        mock_vlc_player.set_media.assert_called_once_with(media_new_callbacks.return_value)
+        mock_vlc_player.play.assert_called_once()
+        media_new_callbacks.return_value.release.assert_called_once()
+
+    def test_audio_stream_reads_chunks_in_order(self):
+        """Test that VLC reads every chunk and then the end of the stream"""
+        stream = helpers.AudioStream(iter([b"abc", b"defg"]))
+        stream.start()
+        buffer = ctypes.create_string_buffer(5)
+
+        data = b""
+        while True:
+            length = stream._read(None, buffer, 5)
+            if length == 0:
+                break
+            data += buffer.raw[:length]
+
+        assert data == b"abcdefg"
+
+    def test_audio_stream_handles_stream_errors(self, mocker):
+        """Test that a broken download ends the stream instead of blocking"""
+        mock_logging = mocker.patch("helpers.logging")
+
+        def chunks():
+            yield b"ab"
+            raise IOError("connection reset")
+
+        stream = helpers.AudioStream(chunks())
+        stream.start()
+        buffer = ctypes.create_string_buffer(5)
+
+        assert stream._read(None, buffer, 5) == 2
+        assert stream._read(None, buffer, 5) == 0
+        mock_logging.error.assert_called_once()
 
 
 class TestDisplayImage:
     """Tests for display_image function"""
 
-    def test_display_image_with_valid_path(self, mock_subprocess, tmp_path):
+    def test_display_image_with_valid_path(self, fp, dummy_image_file):
         """Test that a valid image is displayed correctly"""
-        # Create a test image file
-        image_file = tmp_path / "test.png"
-        image_file.write_text("test image")
-
-        # Reset the global _fbi_process before test
-        helpers._fbi_process = None
+        command = fbi_command(dummy_image_file)
+        fp.register(command)
 
         # Call the function
-        helpers.display_image(str(image_file))
+        helpers.display_image(dummy_image_file)
 
         # Verify fbi was called with correct arguments
-        mock_subprocess["popen"].assert_called_once()
-        args = mock_subprocess["popen"].call_args[0][0]
-        assert "sudo" in args
-        assert "fbi" in args
-        assert "--noverbose" in args
+        assert fp.call_count(command) == 1
 
-    def test_display_image_with_missing_file(self, mock_subprocess, mocker):
+    def test_display_image_with_missing_file(self, fp, mocker):
         """Test that missing image file is handled gracefully"""
         mock_logging = mocker.patch("helpers.logging")
 
@@ -93,73 +260,280 @@ class TestDisplayImage:
         mock_logging.error.assert_called_once()
 
         # Verify fbi was NOT called
-        mock_subprocess["popen"].assert_not_called()
+        assert not fp.calls
 
-    def test_display_image_prevents_command_injection(self, mock_subprocess, tmp_path):
+    def test_display_image_prevents_command_injection(self, fp, tmp_path):
         """Test that malicious paths don't cause command injection"""
         # Create a file with special characters in name (safe version)
-        image_file = tmp_path / "test_image.png"
+        image_file = tmp_path / "test_image; rm -rf ~.png"
         image_file.write_text("test")
+        # Only the argument list is registered, a shell command string wouldn't match
+        recorder = fp.register(fbi_command(image_file))
 
         # Call with the path
         helpers.display_image(str(image_file))
 
-        # Verify that Popen was called with list args (not shell=True)
-        mock_subprocess["popen"].assert_called_once()
-        call_args = mock_subprocess["popen"].call_args
-
-        # First argument should be a list
-        assert isinstance(call_args[0][0], list)
-
         # Should not use shell=True
-        assert call_args[1].get("shell", False) is False
+        assert recorder.first_call.kwargs.get("shell", False) is False
 
-    def test_display_image_uses_absolute_path(self, mock_subprocess, tmp_path):
+    def test_display_image_uses_absolute_path(self, fp, dummy_image_file, monkeypatch):
         """Test that relative paths are converted to absolute paths"""
-        # Create a test image
-        image_file = tmp_path / "test.png"
-        image_file.write_text("test")
+        monkeypatch.chdir(os.path.dirname(dummy_image_file))
+        command = fbi_command(dummy_image_file)
+        fp.register(command)
 
-        # Call with path
-        helpers.display_image(str(image_file))
+        # Call with a relative path
+        helpers.display_image(os.path.basename(dummy_image_file))
 
-        # Get the path that was passed to fbi
-        popen_args = mock_subprocess["popen"].call_args[0][0]
+        assert fp.call_count(command) == 1
 
-        # Find the image path in arguments (should be an absolute path to our file)
-        image_path = None
-        for arg in popen_args:
-            if arg.endswith("test.png"):
-                image_path = arg
-                break
 
-        assert image_path is not None, "Image path not found in fbi arguments"
-        assert os.path.isabs(image_path), "Image path should be absolute"
+class TestFbiDisplay:
+    """Tests for showing images with fbi"""
 
-    def test_display_image_kills_previous_fbi(self, mock_subprocess, tmp_path):
+    def test_show_kills_previous_fbi(self, fp, dummy_image_file):
         """Test that previous fbi process is killed before displaying new image"""
-        import unittest.mock as mock
+        # fbi keeps running until it's sent a signal
+        terminated = threading.Event()
+        recorder = fp.register(
+            fbi_command(dummy_image_file),
+            callback=lambda process: terminated.wait(),
+            signal_callback=lambda process, signum: terminated.set(),
+            occurrences=2,
+        )
+        display = helpers.FbiDisplay()
+
+        # First call - creates the process
+        display.show(dummy_image_file)
+        assert display.is_running()
+
+        # Second call - should terminate the previous process
+        display.show(dummy_image_file)
+
+        # Verify the first process was terminated
+        assert recorder.calls[0].received_signals() == (signal.SIGTERM,)
 
+        # Verify fbi was started twice (once for each display)
+        assert fp.call_count(fbi_command(dummy_image_file)) == 2
+
+    def test_stop_kills_hung_fbi(self, mocker):
+        """Test that sudo is killed and reaped if fbi ignores SIGTERM"""
+        # fp replaces subprocess.Popen and any alias of it, so the spec lists
+        # the Popen methods helpers uses
+        hung_process = Mock(spec=["pid", "poll", "terminate", "wait", "kill"])
+        hung_process.poll.return_value = None
+        hung_process.wait.side_effect = [subprocess.TimeoutExpired("fbi", 0.5), 0]
+        mocker.patch("helpers.logging")
+        display = helpers.FbiDisplay()
+        display._process = hung_process
+
+        display.stop()
+
+        hung_process.terminate.assert_called_once()
+        hung_process.wait.assert_has_calls(
+            [call(timeout=helpers.FBI_TERMINATE_TIMEOUT_SECONDS), call()]
+        )
+        hung_process.kill.assert_called_once()
+
+    def test_stop_without_process(self):
+        """Test that stopping before anything was shown does nothing"""
+        display = helpers.FbiDisplay()
+
+        display.stop()
+
+        assert not display.is_running()
+
+
+class TestFramebuffer:
+    """Tests for the Framebuffer writer"""
+
+    def test_reads_geometry_from_sysfs(self, framebuffer_files):
+        """Test that the visible mode is preferred over the virtual size"""
+        device, sysfs_dir = framebuffer_files(bits_per_pixel=32)
+
+        framebuffer = helpers.Framebuffer(device, sysfs_dir)
+
+        assert (framebuffer.width, framebuffer.height) == (4, 2)
+        assert framebuffer.bits_per_pixel == 32
+        assert framebuffer.stride == 16
+        framebuffer.close()
+
+    def test_falls_back_to_virtual_size(self, framebuffer_files):
+        """Test that virtual_size is used when no mode is reported"""
+        device, sysfs_dir = framebuffer_files(modes=None)
+
+        framebuffer = helpers.Framebuffer(device, sysfs_dir)
+
+        assert (framebuffer.width, framebuffer.height) == (4, 4)
+        framebuffer.close()
+
+    def test_rejects_unsupported_depth(self, framebuffer_files):
+        """Test that unsupported pixel formats are refused"""
+        device, sysfs_dir = framebuffer_files(bits_per_pixel=8)
+
+        with pytest.raises(ValueError):
+            helpers.Framebuffer(device, sysfs_dir)
+
+    def test_encode_32bpp(self, framebuffer_files):
+        """Test that 32 bpp pixels are written as BGRX"""
+        framebuffer = helpers.Framebuffer(*framebuffer_files(bits_per_pixel=32))
+
+        data = framebuffer.encode(Image.new("RGB", (4, 2), (255, 128, 0)))
+
+        assert data == bytes([0, 128, 255, 0]) * 8
+        framebuffer.close()
+
+    def test_encode_16bpp(self, framebuffer_files):
+        """Test that 16 bpp pixels are packed as little-endian RGB565"""
+        framebuffer = helpers.Framebuffer(*framebuffer_files(bits_per_pixel=16))
+
+        data = framebuffer.encode(Image.new("RGB", (4, 2), (255, 0, 0)))
+
+        assert data == (0xF800).to_bytes(2, "little") * 8
+        framebuffer.close()
+
+    def test_encode_resizes_and_pads_rows(self, framebuffer_files):
+        """Test that images are scaled to the screen and rows padded to the stride"""
+        framebuffer = helpers.Framebuffer(*framebuffer_files(bits_per_pixel=24, stride=16))
+
+        data = framebuffer.encode(Image.new("RGB", (8, 4), (1, 2, 3)))
+
+        row = bytes([3, 2, 1]) * 4 + b"\x00" * 4
+        assert data == row * 2
+        framebuffer.close()
+
+    def test_encode_letterboxes_other_aspect_ratios(self, framebuffer_files):
+        """Test that images are scaled to fit and centred on black, not stretched"""
+        framebuffer = helpers.Framebuffer(*framebuffer_files(bits_per_pixel=32))
+
+        data = framebuffer.encode(Image.new("RGB", (2, 2), (255, 255, 255)))
+
+        black, white = bytes([0, 0, 0, 0]), bytes([255, 255, 255, 0])
+        assert data == (black + white * 2 + black) * 2
+        framebuffer.close()
+
+    def test_show_writes_to_device(self, framebuffer_files, tmp_path):
+        """Test that showing an image writes the encoded frame to the device"""
+        device, sysfs_dir = framebuffer_files(bits_per_pixel=32)
         image_file = tmp_path / "test.png"
-        image_file.write_text("test")
+        Image.new("RGB", (4, 2), (0, 0, 255)).save(image_file)
+        framebuffer = helpers.Framebuffer(device, sysfs_dir)
 
-        # Create a mock for the first fbi process
-        first_process = mock.MagicMock()
-        first_process.poll.return_value = None  # Process is still running
-        first_process.pid = 12345
+        framebuffer.show(str(image_file))
+        framebuffer.close()
 
-        # Set up mock to return different process objects for each call
-        process_calls = [first_process, mock.MagicMock()]
-        mock_subprocess["popen"].side_effect = process_calls
+        with open(device, "rb") as device_file:
+            assert device_file.read() == bytes([255, 0, 0, 0]) * 8
 
-        # First call - creates the process
-        helpers.display_image(str(image_file))
+    def test_show_reuses_decoded_frame(self, framebuffer_files, tmp_path, mocker):
+        """Test that an unchanged image is only decoded once"""
+        image_file = tmp_path / "test.png"
+        Image.new("RGB", (4, 2), (0, 0, 255)).save(image_file)
+        framebuffer = helpers.Framebuffer(*framebuffer_files(bits_per_pixel=32))
+        encode = mocker.spy(framebuffer, "encode")
 
-        # Second call - should terminate the previous process
-        helpers.display_image(str(image_file))
+        framebuffer.show(str(image_file))
+        framebuffer.show(str(image_file))
 
-        # Verify the first process was terminated
-        first_process.terminate.assert_called_once()
+        encode.assert_called_once()
+        framebuffer.close()
+
+    def test_show_decodes_changed_image(self, framebuffer_files, tmp_path):
+        """Test that an image rewritten on disk is decoded again"""
+        device, sysfs_dir = framebuffer_files(bits_per_pixel=32)
+        image_file = tmp_path / "test.png"
+        Image.new("RGB", (4, 2), (0, 0, 255)).save(image_file)
+        framebuffer = helpers.Framebuffer(device, sysfs_dir)
+        framebuffer.show(str(image_file))
+
+        Image.new("RGB", (4, 2), (255, 0, 0)).save(image_file)
+        os.utime(image_file, (0, 0))
+        framebuffer.show(str(image_file))
+        framebuffer.close()
+
+        with open(device, "rb") as device_file:
+            assert device_file.read() == bytes([0, 0, 255, 0]) * 8
+
+    def test_frame_cache_is_bounded(self, framebuffer_files, tmp_path, monkeypatch):
+        """Test that the least recently shown frames are dropped"""
+        monkeypatch.setattr(helpers, "FRAME_CACHE_SIZE", 2)
+        framebuffer = helpers.Framebuffer(*framebuffer_files(bits_per_pixel=32))
+        paths = []
+        for index in range(3):
+            image_file = tmp_path / f"{index}.png"
+            Image.new("RGB", (4, 2)).save(image_file)
+            paths.append(str(image_file))
+            framebuffer.frame(str(image_file))
+
+        assert list(framebuffer._frames) == paths[1:]
+        framebuffer.close()
+
+    def test_preload_images(self, dummy_image_file, monkeypatch):
+        """Test that preloading decodes images without displaying them"""
+        framebuffer = Mock()
+        monkeypatch.setattr(helpers, "_framebuffer", framebuffer)
+        monkeypatch.setattr(helpers, "_framebuffer_checked", True)
+
+        helpers.preload_images([dummy_image_file])
+
+        framebuffer.frame.assert_called_once_with(dummy_image_file)
+        framebuffer.show.assert_not_called()
+
+    def test_display_image_uses_framebuffer(self, fp, dummy_image_file, monkeypatch):
+        """Test that display_image writes to the framebuffer instead of spawning fbi"""
+        framebuffer = Mock()
+        monkeypatch.setattr(helpers, "_framebuffer", framebuffer)
+
+        helpers.display_image(dummy_image_file)
+
+        framebuffer.show.assert_called_once_with(dummy_image_file)
+        assert not fp.calls
+
+    def test_display_image_falls_back_to_fbi(self, fp, dummy_image_file, monkeypatch):
+        """Test that fbi is used if writing to the framebuffer fails"""
+        fp.register(fbi_command(dummy_image_file))
+        framebuffer = Mock()
+        framebuffer.show.side_effect = OSError("device busy")
+        monkeypatch.setattr(helpers, "_framebuffer", framebuffer)
+
+        helpers.display_image(dummy_image_file)
+
+        assert fp.call_count(fbi_command(dummy_image_file)) == 1
+
+    def test_get_framebuffer_unavailable(self, monkeypatch):
+        """Test that a missing framebuffer is detected once and remembered"""
+        monkeypatch.setattr(helpers, "_framebuffer_checked", False)
+        mock_framebuffer_class = Mock(side_effect=OSError("no such device"))
+        monkeypatch.setattr(helpers, "Framebuffer", mock_framebuffer_class)
+
+        assert helpers._get_framebuffer() is None
+        assert helpers._get_framebuffer() is None
+
+        mock_framebuffer_class.assert_called_once()
+
+
+class TestCleanupDisplay:
+    """Tests for cleanup_display function"""
+
+    def test_cleanup_closes_framebuffer(self, monkeypatch):
+        """Test that the framebuffer is closed on shutdown"""
+        framebuffer = Mock()
+        monkeypatch.setattr(helpers, "_framebuffer", framebuffer)
+
+        helpers.cleanup_display()
+
+        framebuffer.close.assert_called_once()
+        assert helpers._framebuffer is None
+
+    def test_display_image_after_cleanup(self, fp, dummy_image_file, monkeypatch):
+        """Test that nothing is shown after shutdown, not even with fbi"""
+        framebuffer = Mock()
+        monkeypatch.setattr(helpers, "_framebuffer", framebuffer)
+
+        helpers.cleanup_display()
+        helpers.display_image(dummy_image_file)
+        helpers.preload_images([dummy_image_file])
 
-        # Verify Popen was called twice (once for each display)
-        assert mock_subprocess["popen"].call_count == 2
+        framebuffer.show.assert_not_called()
+        framebuffer.frame.assert_not_called()
+        assert not fp.calls
@@ -0,0 +1,144 @@
+"""
+Unit tests for hotword.py module
+Tests for feeding microphone frames to Porcupine
+"""
+
+import pytest
+import queue
+from unittest.mock import Mock
+import hotword
+
+SUCCESS = object()
+FAILURE = object()
+
+
+@pytest.fixture
+def porcupine():
+    """Mock Porcupine handle with the internals used for direct buffers"""
+    handle = Mock()
+    handle.frame_length = 4
+    handle.PicovoiceStatuses.SUCCESS = SUCCESS
+    handle._PICOVOICE_STATUS_TO_EXCEPTION = {FAILURE: RuntimeError}
+
+    def process(native_handle, buffer, result):
+        # Report a detection when the frame starts with a non-zero sample
+        result._obj.value = 0 if buffer[0] else -1
+        return SUCCESS
+
+    handle._process_func = Mock(side_effect=process)
+    return handle
+
+
+@pytest.fixture
+def recorder():
+    """Mock PvRecorder with the internals used for direct buffers"""
+    recorder = Mock()
+    recorder.PvRecorderStatuses.SUCCESS = SUCCESS
+    recorder._PVRECORDER_STATUS_TO_EXCEPTION = {FAILURE: IOError}
+    recorder._read_func = Mock(return_value=SUCCESS)
+    return recorder
+
+
+class TestHotwordDetector:
+    """Tests for HotwordDetector"""
+
+    def test_process_next_frame_reuses_buffer(self, porcupine, recorder):
+        """Test that every frame is read into the same buffer Porcupine gets"""
+        detector = hotword.HotwordDetector(porcupine, recorder)
+
+        assert detector.process_next_frame() == -1
+        assert detector.process_next_frame() == -1
+
+        buffers = [call.args[1] for call in recorder._read_func.call_args_list]
+        assert buffers[0] is buffers[1]
+        assert porcupine._process_func.call_args.args[1] is buffers[0]
+        recorder.read.assert_not_called()
+        porcupine.process.assert_not_called()
+
+    def test_process_next_frame_detects_keyword(self, porcupine, recorder):
+        """Test that the keyword index from Porcupine is returned"""
+
+        def read(native_handle, buffer):
+            buffer[0] = 1000
+            return SUCCESS
+
+        recorder._read_func.side_effect = read
+        detector = hotword.HotwordDetector(porcupine, recorder)
+
+        assert detector.process_next_frame() == 0
+
+    def test_process_next_frame_read_error(self, porcupine, recorder):
+        """Test that recorder errors are raised like PvRecorder.read() does"""
+        recorder._read_func.return_value = FAILURE
+        detector = hotword.HotwordDetector(porcupine, recorder)
+
+        with pytest.raises(IOError):
+            detector.process_next_frame()
+
+    def test_process_next_frame_without_internals(self, mocker):
+        """Test that the public API is used if the internals aren't there"""
+        mocker.patch("hotword.logging")
+        handle = Mock(spec=["frame_length", "process"])
+        handle.frame_length = 4
+        handle.process.return_value = 0
+        recorder = Mock(spec=["read"])
+        recorder.read.return_value = [0, 0, 0, 0]
+
+        detector = hotword.HotwordDetector(handle, recorder)
+
+        assert detector.process_next_frame() == 0
+        handle.process.assert_called_once_with([0, 0, 0, 0])
+
+
+class TestHotwordListener:
+    """Tests for HotwordListener"""
+
+    def test_wait_returns_detection(self):
+        """Test that the keyword is reported and the microphone released"""
+        detector = Mock()
+        detector.process_next_frame.side_effect = [-1, -1, 0]
+        recorder = Mock()
+        listener = hotword.HotwordListener(detector, recorder)
+
+        listener.listen()
+        assert listener.wait(timeout=1) == 0
+        listener.stop()
+
+        recorder.start.assert_called_once()
+        recorder.stop.assert_called_once()
+        assert detector.process_next_frame.call_count == 3
+
+    def test_listen_again_after_detection(self):
+        """Test that the same thread picks up listening again"""
+        detector = Mock()
+        detector.process_next_frame.side_effect = [0, -1, 1]
+        recorder = Mock()
+        listener = hotword.HotwordListener(detector, recorder)
+
+        listener.listen()
+        assert listener.wait(timeout=1) == 0
+        listener.listen()
+        assert listener.wait(timeout=1) == 1
+        listener.stop()
+
+        assert recorder.start.call_count == 2
+        assert recorder.stop.call_count == 2
+
+    def test_wait_timeout(self):
+        """Test that waiting gives up if the hotword isn't heard"""
+        listener = hotword.HotwordListener(Mock(), Mock())
+
+        with pytest.raises(queue.Empty):
+            listener.wait(timeout=0.01)
+
+    def test_wait_raises_recorder_error(self, mocker):
+        """Test that an error on the listener thread is raised by wait()"""
+        mocker.patch("hotword.logging")
+        detector = Mock()
+        detector.process_next_frame.side_effect = IOError("device lost")
+        listener = hotword.HotwordListener(detector, Mock())
+
+        listener.listen()
+        with pytest.raises(IOError):
+            listener.wait(timeout=1)
+        listener.stop()
@@ -0,0 +1,33 @@
+"""
+Unit tests for http_session.py module
+Tests for the shared pooled HTTP session
+"""
+
+import pytest
+import requests
+import http_session
+
+
+class TestCreateSession:
+    """Tests for create_session function"""
+
+    @pytest.mark.parametrize("prefix", ["http://", "https://"])
+    def test_adapter_mounted_for_scheme(self, prefix):
+        """Test that the pooled adapter handles both http and https"""
+        session = http_session.create_session()
+
+        adapter = session.get_adapter(f"{prefix}example.com")
+
+        assert isinstance(adapter, requests.adapters.HTTPAdapter)
+        assert adapter._pool_connections == http_session.POOL_CONNECTIONS
+        assert adapter._pool_maxsize == http_session.POOL_MAXSIZE
+
+    def test_adapter_retries_transient_errors(self):
+        """Test that transient HTTP errors are retried with backoff"""
+        session = http_session.create_session()
+
+        retries = session.get_adapter("https://example.com").max_retries
+
+        assert retries.total == http_session.RETRY_TOTAL
+        assert retries.backoff_factor == http_session.RETRY_BACKOFF_FACTOR
+        assert set(retries.status_forcelist) == {429, 500, 502, 503, 504}
@@ -0,0 +1,75 @@
+"""
+Unit tests for intents.py module
+Tests for matching recognised speech to local commands
+"""
+
+import pytest
+import intents
+
+
+@pytest.fixture(autouse=True, params=["automaton", "regex"])
+def matcher(request, mocker):
+    """Run every test against both the Aho-Corasick and the regex matcher"""
+    if request.param == "automaton":
+        if intents.ahocorasick is None:
+            pytest.skip("pyahocorasick is not installed")
+    else:
+        mocker.patch("intents._automaton", None)
+    return request.param
+
+
+class TestClassify:
+    """Tests for classify function"""
+
+    @pytest.mark.parametrize(
+        "text,expected",
+        [
+            ("never mind", intents.CANCEL),
+            ("ok thanks", intents.CANCEL),
+            ("please cancel that", intents.CANCEL),
+            ("send it to me", intents.SEND_IMAGE),
+            ("put it on telegram", intents.SEND_IMAGE),
+            ("make another one", intents.MAKE_ANOTHER),
+            ("show me a random picture", intents.SHOW_RANDOM_IMAGE),
+            ("make image of a cat", intents.MAKE_IMAGE),
+        ],
+    )
+    def test_classify_commands(self, text, expected):
+        """Test that each command phrase is recognised"""
+        assert intents.classify(text) == expected
+
+    def test_classify_chat(self):
+        """Test that other speech is left for the assistant"""
+        assert intents.classify("what is the tallest mountain") is None
+
+    def test_classify_first_command_wins(self):
+        """Test that commands are checked in priority order"""
+        assert intents.classify("stop and send the image") == intents.CANCEL
+
+    def test_classify_priority_over_position(self):
+        """Test that a higher priority command later in the speech still wins"""
+        assert intents.classify("make image and then never mind") == intents.CANCEL
+
+    def test_classify_matches_whole_words(self):
+        """Test that phrases don't match inside longer words"""
+        assert intents.classify("tell me about the cancellation policy") is None
+        assert intents.classify("who was the sender of the letter") is None
+
+    def test_classify_phrase_at_edges(self):
+        """Test that phrases at the start and end of the speech match"""
+        assert intents.classify("cancel") == intents.CANCEL
+        assert intents.classify("random") == intents.SHOW_RANDOM_IMAGE
+
+    def test_classify_ignores_case(self):
+        """Test that matching is case-insensitive"""
+        assert intents.classify("Make Image of a dog") == intents.MAKE_IMAGE
+
+
+class TestStripCommand:
+    """Tests for strip_command function"""
+
+    def test_strip_command_returns_prompt(self):
+        """Test that the command phrase is removed from the prompt"""
+        result = intents.strip_command("make image of a cat", intents.MAKE_IMAGE)
+
+        assert result == "of a cat"
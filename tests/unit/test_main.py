@@ -0,0 +1,249 @@
+"""
+Unit tests for main.py module
+Tests for Stable Diffusion rendering, health checks and input handling
+"""
+
+import pytest
+import requests
+from unittest.mock import Mock
+from PIL import Image
+import main
+import prompt_cache
+
+
+@pytest.fixture
+def stable_diffusion(mocker, tmp_path):
+    """Configured Stable Diffusion server with a mocked client"""
+    mocker.patch("main.settings.stable_diffusion_api", "localhost")
+    mocker.patch("main.settings.stable_diffusion_port", "7860")
+    mocker.patch("gallery.SAVED_IMAGES_DIR", str(tmp_path))
+    mocker.patch("gallery.new_filename", return_value="img_00000001.png")
+    mocker.patch("gallery.add")
+    api = Mock()
+    mocker.patch("main._get_stable_diffusion_api", return_value=api)
+    return api
+
+
+@pytest.fixture
+def cache(mocker):
+    """Mocked prompt cache holding no renders"""
+    cache = mocker.patch("main._prompt_cache", spec=prompt_cache.PromptCache)
+    cache.find.return_value = None
+    cache.lookup.return_value = None
+    return cache
+
+
+@pytest.fixture
+def earlier_render(tmp_path):
+    """An earlier render of a similar prompt"""
+    file_path = tmp_path / "earlier.png"
+    Image.new("RGB", (8, 8)).save(file_path)
+    return str(file_path)
+
+
+class TestGenerateStableDiffusionImage:
+    """Tests for generate_stable_diffusion_image function"""
+
+    def test_repeated_prompt_is_reused(self, stable_diffusion, cache, earlier_render):
+        """Test that a render of the same prompt is returned without rendering"""
+        cache.find.return_value = earlier_render
+
+        result = main.generate_stable_diffusion_image("a cat on a sofa")
+
+        assert result == earlier_render
+        cache.find.assert_called_once_with("a cat on a sofa", ["lcmxl"])
+        stable_diffusion.txt2img.assert_not_called()
+        stable_diffusion.img2img.assert_not_called()
+        cache.add.assert_not_called()
+
+    def test_similar_prompt_starts_from_earlier_render(
+        self, stable_diffusion, cache, earlier_render, tmp_path
+    ):
+        """Test that a render of a similar prompt is used for img2img"""
+        cache.lookup.return_value = (earlier_render, prompt_cache.IMG2IMG_SIMILARITY)
+
+        result = main.generate_stable_diffusion_image("a black cat on a sofa")
+
+        expected_path = str(tmp_path / "img_00000001.png")
+        assert result == expected_path
+        stable_diffusion.txt2img.assert_not_called()
+        kwargs = stable_diffusion.img2img.call_args.kwargs
+        assert kwargs["prompt"] == "a black cat on a sofa"
+        assert kwargs["denoising_strength"] == main.STABLE_DIFFUSION_DENOISING_STRENGTH
+        assert (kwargs["width"], kwargs["height"]) == (main.DISPLAY_WIDTH, main.DISPLAY_HEIGHT)
+        assert len(kwargs["images"]) == 1
+        stable_diffusion.img2img.return_value.image.save.assert_called_once()
+        main.gallery.add.assert_called_once_with("img_00000001.png")
+        cache.add.assert_called_once_with("a black cat on a sofa", ["lcmxl"], expected_path)
+
+    def test_new_prompt_is_rendered(self, stable_diffusion, cache, earlier_render, tmp_path):
+        """Test that a prompt unlike any earlier one is rendered from text"""
+        cache.lookup.return_value = (earlier_render, prompt_cache.IMG2IMG_SIMILARITY - 0.1)
+
+        result = main.generate_stable_diffusion_image("a dog in a park", ["anime"])
+
+        expected_path = str(tmp_path / "img_00000001.png")
+        assert result == expected_path
+        stable_diffusion.img2img.assert_not_called()
+        kwargs = stable_diffusion.txt2img.call_args.kwargs
+        assert kwargs["prompt"] == "a dog in a park"
+        assert kwargs["styles"] == ["anime"]
+        main.gallery.add.assert_called_once_with("img_00000001.png")
+        cache.add.assert_called_once_with("a dog in a park", ["anime"], expected_path)
+
+    def test_cache_can_be_skipped(self, stable_diffusion, cache):
+        """Test that earlier renders are ignored when the cache isn't used"""
+        main.generate_stable_diffusion_image("a cat on a sofa", use_cache=False)
+
+        cache.find.assert_not_called()
+        cache.lookup.assert_not_called()
+        stable_diffusion.txt2img.assert_called_once()
+
+    def test_render_failure_returns_none(self, stable_diffusion, cache):
+        """Test that a failed render isn't recorded"""
+        stable_diffusion.txt2img.side_effect = RuntimeError("server error")
+
+        assert main.generate_stable_diffusion_image("a cat on a sofa") is None
+        main.gallery.add.assert_not_called()
+        cache.add.assert_not_called()
+
+    def test_not_configured_returns_none(self, mocker, cache):
+        """Test that nothing is rendered without a Stable Diffusion server"""
+        mocker.patch("main.settings.stable_diffusion_api", "")
+        api = mocker.patch("main._get_stable_diffusion_api")
+
+        assert main.generate_stable_diffusion_image("a cat on a sofa") is None
+        api.assert_not_called()
+
+
+class TestGetSamplerOptions:
+    """Tests for _get_sampler_options function"""
+
+    def test_style_options(self):
+        """Test that a style's own sampler, steps and CFG scale are used"""
+        assert (
+            main._get_sampler_options(["anime"]) == main.STABLE_DIFFUSION_SAMPLER_OPTIONS["anime"]
+        )
+
+    def test_default_style(self):
+        """Test that the default style renders with the LCM sampler"""
+        options = main._get_sampler_options(["lcmxl"])
+
+        assert options == {"sampler_name": "LCM", "steps": 4, "cfg_scale": 1.5}
+
+    def test_first_known_style_decides(self):
+        """Test that unknown styles are skipped and the first known one is used"""
+        options = main._get_sampler_options(["watercolor", "anime", "lcmxl"])
+
+        assert options == main.STABLE_DIFFUSION_SAMPLER_OPTIONS["anime"]
+
+    @pytest.mark.parametrize("styles", [[], ["watercolor"]])
+    def test_unknown_styles_fall_back(self, styles):
+        """Test that styles without options of their own keep the server's sampler"""
+        assert main._get_sampler_options(styles) == {"cfg_scale": 2}
+
+    def test_settings_override(self, mocker):
+        """Test that the sampler and steps can be overridden per style in settings.py"""
+        mocker.patch(
+            "main.settings.stable_diffusion_sampler_by_style", {"anime": "DPM++ 2M"}, create=True
+        )
+        mocker.patch("main.settings.stable_diffusion_steps_by_style", {"anime": 20}, create=True)
+
+        options = main._get_sampler_options(["anime"])
+
+        assert options == {"sampler_name": "DPM++ 2M", "steps": 20, "cfg_scale": 2}
+        assert main.STABLE_DIFFUSION_SAMPLER_OPTIONS["anime"]["steps"] == 8
+
+    def test_override_for_other_style_is_ignored(self, mocker):
+        """Test that overrides only apply to the style they are set for"""
+        mocker.patch("main.settings.stable_diffusion_steps_by_style", {"anime": 20}, create=True)
+
+        assert main._get_sampler_options(["lcmxl"])["steps"] == 4
+
+    @pytest.mark.parametrize("steps", [0, 101, "20"])
+    def test_invalid_steps_override_is_ignored(self, mocker, steps):
+        """Test that an out of range steps override keeps the style's steps"""
+        mocker.patch("main.settings.stable_diffusion_steps_by_style", {"anime": steps}, create=True)
+
+        assert main._get_sampler_options(["anime"])["steps"] == 8
+
+
+class TestCheckExternalServices:
+    """Tests for check_external_services function"""
+
+    @pytest.fixture
+    def stable_diffusion_server(self, mocker):
+        """Configured Stable Diffusion server answering the probe"""
+        mocker.patch("main.settings.stable_diffusion_api", "localhost")
+        mocker.patch("main.settings.stable_diffusion_port", "7860")
+        return mocker.patch("main.requests.get", return_value=Mock(status_code=200))
+
+    def test_all_services_up(self, mock_openai_client, stable_diffusion_server):
+        """Test that both services are probed once, without retries"""
+        assert main.check_external_services(mock_openai_client) is True
+
+        mock_openai_client.models.list.assert_called_once_with(limit=1)
+        stable_diffusion_server.assert_called_once_with(
+            "http://localhost:7860", timeout=main.HEALTH_CHECK_TIMEOUT_SECONDS
+        )
+
+    def test_openai_down_raises(self, mock_openai_client, stable_diffusion_server):
+        """Test that an unreachable OpenAI API stops startup"""
+        mock_openai_client.models.list.side_effect = ConnectionError("unreachable")
+
+        with pytest.raises(main.ExternalServiceError):
+            main.check_external_services(mock_openai_client)
+
+    def test_stable_diffusion_down_is_tolerated(self, mock_openai_client, stable_diffusion_server):
+        """Test that an unreachable Stable Diffusion server is only logged"""
+        stable_diffusion_server.side_effect = requests.ConnectionError("unreachable")
+
+        assert main.check_external_services(mock_openai_client) is True
+
+    def test_stable_diffusion_not_configured(self, mocker, mock_openai_client):
+        """Test that Stable Diffusion isn't probed when it isn't configured"""
+        mocker.patch("main.settings.stable_diffusion_api", "")
+        get = mocker.patch("main.requests.get")
+
+        assert main.check_external_services(mock_openai_client) is True
+        get.assert_not_called()
+
+
+class TestSanitizeInput:
+    """Tests for sanitize_input function"""
+
+    @pytest.mark.parametrize(
+        "character",
+        [
+            "\x00",  # null byte
+            "\x1b",  # escape
+            "\x7f",  # delete
+            "\u200b",  # zero width space
+            "\u202e",  # right-to-left override
+            "\u00a0",  # no-break space
+            "\u2028",  # line separator
+            "\u3000",  # ideographic space
+        ],
+    )
+    def test_unprintable_characters_are_stripped(self, character):
+        """Test that control, format and non-space separator characters are removed"""
+        assert main.sanitize_input(f"draw{character} a cat") == "draw a cat"
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "draw a cat",
+            "draw\na cat",
+            "draw\ta cat",
+            "piirrä kissa",
+            "нарисуй кота",
+            "猫を描いて",
+        ],
+    )
+    def test_printable_text_is_kept(self, text):
+        """Test that spaces, newlines, tabs and non-ASCII letters are kept"""
+        assert main.sanitize_input(text) == text
+
+    def test_long_input_is_truncated(self):
+        """Test that input is limited to 500 characters"""
+        assert main.sanitize_input("a" * 600) == "a" * 500
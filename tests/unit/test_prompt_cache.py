@@ -0,0 +1,110 @@
+"""
+Unit tests for prompt_cache.py module
+Tests for reusing Stable Diffusion renders of similar prompts
+"""
+
+import pytest
+import prompt_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """A cache backed by a file in a temporary folder"""
+    return prompt_cache.PromptCache(str(tmp_path / "prompt_cache.json"))
+
+
+@pytest.fixture
+def image(tmp_path):
+    """A saved render"""
+    file_path = tmp_path / "render.png"
+    file_path.touch()
+    return str(file_path)
+
+
+class TestFind:
+    """Tests for find function"""
+
+    def test_same_prompt_is_reused(self, cache, image):
+        """Test that a repeated prompt matches its render"""
+        cache.add("A cat, on a sofa", ["lcmxl"], image)
+
+        assert cache.find("a cat on a  sofa", ["lcmxl"]) == image
+
+    def test_reworded_prompt_is_not_reused(self, cache, image):
+        """Test that a prompt with one word changed is rendered again"""
+        cache.add("a black cat sitting on a red sofa", ["lcmxl"], image)
+
+        assert cache.find("a black cat sitting on a blue sofa", ["lcmxl"]) is None
+
+    def test_reordered_prompt_is_not_reused(self, cache, image):
+        """Test that the same words in another order aren't taken for a repeat"""
+        cache.add("dog chasing cat", ["lcmxl"], image)
+
+        assert cache.find("cat chasing dog", ["lcmxl"]) is None
+
+    def test_different_styles_are_ignored(self, cache, image):
+        """Test that a render in another style isn't reused"""
+        cache.add("a cat", ["anime"], image)
+
+        assert cache.find("a cat", ["lcmxl"]) is None
+
+    def test_deleted_image_is_ignored(self, cache, tmp_path):
+        """Test that a render removed from disk isn't reused"""
+        cache.add("a cat", ["lcmxl"], str(tmp_path / "missing.png"))
+
+        assert cache.find("a cat", ["lcmxl"]) is None
+
+
+class TestLookup:
+    """Tests for lookup function"""
+
+    def test_empty_cache(self, cache):
+        """Test that nothing is found in an empty cache"""
+        assert cache.lookup("a cat", ["lcmxl"]) is None
+
+    def test_similar_prompt_is_img2img_candidate(self, cache, image):
+        """Test that a reworded prompt is similar enough to start from"""
+        cache.add("a black cat sitting on a red sofa", ["lcmxl"], image)
+
+        file_path, similarity = cache.lookup("a black cat sitting on a sofa", ["lcmxl"])
+
+        assert file_path == image
+        assert similarity >= prompt_cache.IMG2IMG_SIMILARITY
+
+    def test_reordered_prompt_is_less_similar(self, cache, image):
+        """Test that word order counts towards similarity"""
+        cache.add("dog chasing cat", ["lcmxl"], image)
+
+        _, similarity = cache.lookup("cat chasing dog", ["lcmxl"])
+
+        assert similarity < prompt_cache.IMG2IMG_SIMILARITY
+
+    def test_different_styles_are_ignored(self, cache, image):
+        """Test that a render in another style isn't matched"""
+        cache.add("a cat", ["anime"], image)
+
+        assert cache.lookup("a cat", ["lcmxl"]) is None
+
+    def test_deleted_image_is_ignored(self, cache, tmp_path):
+        """Test that a render removed from disk isn't matched"""
+        cache.add("a cat", ["lcmxl"], str(tmp_path / "missing.png"))
+
+        assert cache.lookup("a cat", ["lcmxl"]) is None
+
+
+class TestPersistence:
+    """Tests for loading and saving the cache file"""
+
+    def test_cache_survives_restart(self, tmp_path, image):
+        """Test that renders are loaded back from disk"""
+        path = str(tmp_path / "prompt_cache.json")
+        prompt_cache.PromptCache(path).add("a cat", ["lcmxl"], image)
+
+        assert prompt_cache.PromptCache(path).find("a cat", ["lcmxl"]) == image
+
+    def test_corrupt_file_starts_empty(self, tmp_path):
+        """Test that an unreadable cache file is ignored"""
+        path = tmp_path / "prompt_cache.json"
+        path.write_text("not json")
+
+        assert prompt_cache.PromptCache(str(path)).lookup("a cat", ["lcmxl"]) is None
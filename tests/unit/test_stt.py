@@ -0,0 +1,153 @@
+"""
+Unit tests for stt.py module
+Tests for speech-to-text engine selection and local recognition
+"""
+
+import pytest
+from unittest.mock import Mock
+import speech_recognition
+import stt
+
+
+@pytest.fixture(autouse=True)
+def no_engine(mocker):
+    """Resolve the engine from each test's settings, not an earlier test's"""
+    mocker.patch("stt._engine", None)
+
+
+@pytest.fixture
+def mock_vosk(mocker):
+    """Mock the optional Vosk package and select it as the engine"""
+    mock_vosk = mocker.patch("stt.vosk")
+    mocker.patch("stt._vosk_model", None)
+    mocker.patch("stt.settings.speech_recognition_engine", "vosk", create=True)
+    mocker.patch("stt.settings.vosk_model_path", "", create=True)
+    return mock_vosk
+
+
+@pytest.fixture
+def mock_whisper(mocker):
+    """Mock the optional faster-whisper package and select it as the engine"""
+    mock_whisper = mocker.patch("stt.faster_whisper")
+    mocker.patch("stt._whisper_model", None)
+    mocker.patch("stt.settings.speech_recognition_engine", "whisper", create=True)
+    mocker.patch("stt.settings.whisper_model", "", create=True)
+    return mock_whisper
+
+
+class TestGetEngine:
+    """Tests for get_engine function"""
+
+    def test_get_engine_defaults_to_google(self, mocker):
+        """Test that Google is used when no engine is configured"""
+        mocker.patch("stt.settings", Mock(spec=[]))
+
+        assert stt.get_engine() == stt.ENGINE_GOOGLE
+
+    def test_get_engine_falls_back_without_vosk(self, mocker):
+        """Test that Google is used if Vosk is selected but not installed"""
+        mocker.patch("stt.vosk", None)
+        mocker.patch("stt.settings.speech_recognition_engine", "vosk", create=True)
+        mocker.patch("stt.logging")
+
+        assert stt.get_engine() == stt.ENGINE_GOOGLE
+
+    def test_get_engine_vosk(self, mock_vosk):
+        """Test that Vosk is used when it's configured and installed"""
+        assert stt.get_engine() == stt.ENGINE_VOSK
+
+    def test_get_engine_whisper(self, mock_whisper):
+        """Test that faster-whisper is used when it's configured and installed"""
+        assert stt.get_engine() == stt.ENGINE_WHISPER
+
+    def test_get_engine_falls_back_without_whisper(self, mocker):
+        """Test that Google is used if faster-whisper is selected but not installed"""
+        mocker.patch("stt.faster_whisper", None)
+        mocker.patch("stt.settings.speech_recognition_engine", "whisper", create=True)
+        mocker.patch("stt.logging")
+
+        assert stt.get_engine() == stt.ENGINE_GOOGLE
+
+    def test_get_engine_warns_once(self, mocker):
+        """Test that a missing engine is resolved and warned about only once"""
+        mocker.patch("stt.vosk", None)
+        mocker.patch("stt.settings.speech_recognition_engine", "vosk", create=True)
+        mock_logging = mocker.patch("stt.logging")
+
+        stt.get_engine()
+        assert stt.get_engine() == stt.ENGINE_GOOGLE
+
+        mock_logging.warning.assert_called_once()
+
+
+class TestTranscribe:
+    """Tests for transcribe function"""
+
+    def test_transcribe_with_google(self, mocker):
+        """Test that the Google recogniser is used by default"""
+        mocker.patch("stt.settings", Mock(spec=[]))
+        recognizer = Mock()
+        recognizer.recognize_google.return_value = "hello"
+        audio = Mock()
+
+        assert stt.transcribe(recognizer, audio) == "hello"
+        recognizer.recognize_google.assert_called_once_with(audio)
+
+    def test_transcribe_with_vosk(self, mock_vosk):
+        """Test that audio is fed to Vosk in chunks and the text returned"""
+        kaldi = mock_vosk.KaldiRecognizer.return_value
+        kaldi.FinalResult.return_value = '{"text": "make image of a cat"}'
+        audio = Mock()
+        audio.get_raw_data.return_value = b"\x00" * (stt.VOSK_CHUNK_BYTES + 10)
+        recognizer = Mock()
+
+        assert stt.transcribe(recognizer, audio) == "make image of a cat"
+
+        audio.get_raw_data.assert_called_once_with(convert_rate=16000, convert_width=2)
+        assert kaldi.AcceptWaveform.call_count == 2
+        recognizer.recognize_google.assert_not_called()
+
+    def test_transcribe_with_vosk_no_speech(self, mock_vosk):
+        """Test that silence raises UnknownValueError like the Google recogniser"""
+        mock_vosk.KaldiRecognizer.return_value.FinalResult.return_value = '{"text": ""}'
+        audio = Mock()
+        audio.get_raw_data.return_value = b""
+
+        with pytest.raises(speech_recognition.UnknownValueError):
+            stt.transcribe(Mock(), audio)
+
+    def test_vosk_model_loaded_once(self, mock_vosk):
+        """Test that the Vosk model is only loaded once"""
+        mock_vosk.KaldiRecognizer.return_value.FinalResult.return_value = '{"text": "hi"}'
+        audio = Mock()
+        audio.get_raw_data.return_value = b"\x00"
+
+        stt.load()
+        stt.transcribe(Mock(), audio)
+
+        mock_vosk.Model.assert_called_once_with(lang="en-us")
+
+    def test_transcribe_with_whisper(self, mock_whisper):
+        """Test that the samples are passed to Whisper as floats and the text joined"""
+        model = mock_whisper.WhisperModel.return_value
+        model.transcribe.return_value = ([Mock(text=" make image"), Mock(text=" of a cat ")], None)
+        audio = Mock()
+        audio.get_raw_data.return_value = (16384).to_bytes(2, "little", signed=True) * 4
+
+        assert stt.transcribe(Mock(), audio) == "make image of a cat"
+
+        mock_whisper.WhisperModel.assert_called_once_with(
+            "tiny.en", device="cpu", compute_type="int8"
+        )
+        samples = model.transcribe.call_args.args[0]
+        assert samples.dtype.name == "float32"
+        assert list(samples) == [0.5] * 4
+
+    def test_transcribe_with_whisper_no_speech(self, mock_whisper):
+        """Test that silence raises UnknownValueError like the Google recogniser"""
+        mock_whisper.WhisperModel.return_value.transcribe.return_value = ([], None)
+        audio = Mock()
+        audio.get_raw_data.return_value = b""
+
+        with pytest.raises(speech_recognition.UnknownValueError):
+            stt.transcribe(Mock(), audio)